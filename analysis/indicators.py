@@ -1,5 +1,15 @@
+import math
+import threading
+from collections import deque
+
+import numpy as np
 import pandas as pd
 
+INDICATOR_COLUMNS = ["MA7", "MA30", "daily_change", "volatility"]
+# Columns expressed in the quote currency (daily_change is a ratio and is currency-free)
+PRICE_LEVEL_COLUMNS = ["price", "MA7", "MA30", "volatility"]
+
+
 def moving_average(df, column="Close", window=7):
     df[f"MA_{window}"] = df[column].rolling(window=window).mean()
     return df
@@ -8,9 +18,175 @@ def volatility(df, column="Close", window=7):
     df[f"Vol_{window}"] = df[column].rolling(window=window).std()
     return df
 
+
+# ==========================================================
+# Incremental (streaming) indicators
+# ==========================================================
+class RollingWindow:
+    """
+    Fixed-size window with O(1) mean/variance updates (windowed Welford).
+
+    Matches pandas rolling(size, min_periods=1).mean() and .std() (ddof=1).
+    """
+
+    def __init__(self, size):
+        self.size = size
+        self.values = deque()
+        self.mean = 0.0
+        self.m2 = 0.0
+
+    def push(self, x):
+        if len(self.values) < self.size:
+            self.values.append(x)
+            delta = x - self.mean
+            self.mean += delta / len(self.values)
+            self.m2 += delta * (x - self.mean)
+        else:
+            old = self.values.popleft()
+            self.values.append(x)
+            old_mean = self.mean
+            self.mean += (x - old) / self.size
+            self.m2 += (x - old) * (x - self.mean + old - old_mean)
+        if self.m2 < 0:
+            self.m2 = 0.0
+
+    def std(self):
+        n = len(self.values)
+        return math.sqrt(self.m2 / (n - 1)) if n > 1 else math.nan
+
+
+class IndicatorEngine:
+    """Keeps rolling state and updates MA7, MA30, daily_change and volatility per tick."""
+
+    def __init__(self, ma_short=7, ma_long=30, vol_window=7):
+        self.short = RollingWindow(ma_short)
+        self.long = RollingWindow(ma_long)
+        self.vol = RollingWindow(vol_window)
+        self.last = None
+        self.warmup = max(ma_short, ma_long, vol_window)
+
+    def update(self, price):
+        """Feed one price; return (MA7, MA30, daily_change, volatility)."""
+        price = float(price)
+        change = (price - self.last) / self.last * 100 if self.last not in (None, 0.0) else math.nan
+        self.last = price
+        self.short.push(price)
+        self.long.push(price)
+        self.vol.push(price)
+        return self.short.mean, self.long.mean, change, self.vol.std()
+
+    def extend(self, prices):
+        """Feed many prices; return an (n, 4) float64 array of indicator rows."""
+        out = np.empty((len(prices), 4), dtype="float64")
+        for i, price in enumerate(prices):
+            out[i] = self.update(price)
+        return out
+
+
+# Vectorized definitions of each indicator column (the pandas reference)
+INDICATORS = {
+    "MA7"         : lambda prices: prices.rolling(7, min_periods=1).mean(),
+    "MA30"        : lambda prices: prices.rolling(30, min_periods=1).mean(),
+    "daily_change": lambda prices: prices.pct_change() * 100,
+    "volatility"  : lambda prices: prices.rolling(7, min_periods=1).std(),
+}
+
+
+def compute_indicator(prices, name):
+    """Compute a single indicator column from a price Series."""
+    return INDICATORS[name](prices)
+
+
+def add_indicators(df, column="price"):
+    """Vectorized one-shot MA7 / MA30 / daily_change / volatility."""
+    for name in INDICATOR_COLUMNS:
+        df[name] = compute_indicator(df[column], name)
+    return df
+
+
+def linear_trend(values):
+    """Least-squares straight line through `values` against their index (closed form)."""
+    y = np.asarray(values, dtype="float64")
+    n = len(y)
+    if n < 2:
+        return y.copy()
+    x = np.arange(n, dtype="float64")
+    x_mean, y_mean = x.mean(), y.mean()
+    slope = np.dot(x - x_mean, y - y_mean) / np.dot(x - x_mean, x - x_mean)
+    return y_mean + slope * (x - x_mean)
+
+
+class IncrementalIndicators:
+    """
+    Indicator columns for one price series whose tail may be rewritten.
+
+    The first refresh computes the columns with pandas. Later refreshes find
+    the first row that differs from what was processed (the price store
+    replaces the last stored points on every tail refresh), re-prime the
+    IndicatorEngine from the rows just before it and only push the rows from
+    there on. A series that changed from its first row is rebuilt.
+    """
+
+    def __init__(self):
+        self.engine = IndicatorEngine()
+        self.values = np.empty((0, 4), dtype="float64")
+        self._timestamps = np.empty(0, dtype="datetime64[ns]")   # rows the values were computed from
+        self._prices = np.empty(0, dtype="float64")
+        self._lock = threading.Lock()
+
+    def _rebuild(self, prices):
+        ref = add_indicators(pd.DataFrame({"price": prices}))
+        self.values = ref[INDICATOR_COLUMNS].to_numpy(dtype="float64")
+        self.engine = IndicatorEngine()
+        self.engine.extend(prices[-(self.engine.warmup + 1):])
+
+    def _first_change(self, timestamps, prices):
+        """Index of the first row that differs from the processed rows (len(processed) if none)."""
+        m = min(len(self._prices), len(prices))
+        same = (self._timestamps[:m] == timestamps[:m]) & (self._prices[:m] == prices[:m])
+        return m if same.all() else int(np.argmin(same))
+
+    def _resume(self, prices, start):
+        """Keep the rows before `start` and recompute the rest with an engine primed on the rows just before it."""
+        if start < len(self.values):
+            self.engine = IndicatorEngine()
+            self.engine.extend(prices[max(start - self.engine.warmup - 1, 0):start])
+        self.values = np.vstack([self.values[:start], self.engine.extend(prices[start:])])
+
+    def refresh(self, history):
+        """Return history ([timestamp, price]) with indicator columns, reusing prior state."""
+        timestamps = history["timestamp"].to_numpy(dtype="datetime64[ns]")
+        prices = history["price"].to_numpy(dtype="float64")
+        with self._lock:
+            start = self._first_change(timestamps, prices)
+            if start == 0:
+                self._rebuild(prices)
+            elif start < len(prices) or start < len(self.values):
+                self._resume(prices, start)
+            self._timestamps, self._prices = timestamps, prices
+            values = self.values
+
+        out = history[["timestamp", "price"]].reset_index(drop=True)
+        out[INDICATOR_COLUMNS] = values
+        return out
+
+
+_series      = {}
+_series_lock = threading.Lock()
+
+
+def indicators_for(key, history):
+    """Indicator frame for the series identified by `key`, updated incrementally across calls."""
+    with _series_lock:
+        state = _series.setdefault(key, IncrementalIndicators())
+    return state.refresh(history)
+
+
 if __name__ == "__main__":
-    import data.fetch_data as fetch
-    df = fetch.fetch_crypto("BTC-USD")
-    df = moving_average(df)
-    df = volatility(df)
-    print(df.tail())
+    # Self-check: the streaming engine matches the pandas rolling output
+    rng = np.random.default_rng(0)
+    prices = 100 * np.exp(np.cumsum(rng.normal(0, 0.02, 5_000)))
+    ref = add_indicators(pd.DataFrame({"price": prices}))[INDICATOR_COLUMNS].to_numpy()
+    got = IndicatorEngine().extend(prices)
+    print("max abs diff per column:", np.nanmax(np.abs(ref - got), axis=0))
+    assert np.allclose(ref, got, equal_nan=True)
@@ -0,0 +1,179 @@
+import atexit
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from multiprocessing import shared_memory
+
+import numpy as np
+import pandas as pd
+
+# Forward Monte Carlo projection of an investment from an asset's price history.
+#
+# Paths are simulated as a (horizon x paths) float32 array, day-major so each
+# day's percentile runs over contiguous memory. Small runs are computed in
+# process; large ones are split into path chunks that worker processes write
+# straight into one shared-memory block, then the percentile bands are
+# computed per block of days, again in parallel. Nothing path-sized is ever
+# pickled between processes.
+#
+# The worker pool is created once per process and reused across runs. It
+# starts workers with forkserver (spawn where that is missing), never fork:
+# the Streamlit server is multithreaded (refresher, fetch pool), and forking
+# it can leave a child holding a lock no thread will ever release.
+
+PROJECTION_WORKERS    = int(os.getenv("PROJECTION_WORKERS", os.cpu_count() or 1))
+PROJECTION_MIN_POOL   = int(os.getenv("PROJECTION_MIN_POOL_PATHS", 20_000))   # below this, no pool
+PROJECTION_CHUNK      = 10_000                                                # paths per task
+PERCENTILES           = (5, 25, 50, 75, 95)
+METHODS               = ("bootstrap", "gbm")
+
+
+def log_returns(prices):
+    """Per-step log returns of a price series (non-positive prices dropped)."""
+    prices = np.asarray(prices, dtype="float64")
+    prices = prices[np.isfinite(prices) & (prices > 0)]
+    return np.diff(np.log(prices))
+
+
+def simulate_growth(returns, n_paths, horizon, method="bootstrap", seed=None):
+    """
+    Growth factors of n_paths paths over `horizon` steps as a (horizon, n_paths) float32 array.
+
+    bootstrap: resamples historical log returns with replacement.
+    gbm: geometric Brownian motion with the drift and volatility of `returns`.
+    """
+    rng = np.random.default_rng(seed)
+    returns = np.asarray(returns, dtype="float64")
+    if method == "bootstrap":
+        steps = returns[rng.integers(0, len(returns), size=(horizon, n_paths))]
+    elif method == "gbm":
+        sigma = returns.std(ddof=1)
+        drift = returns.mean()            # mean log return already includes the -sigma^2/2 term
+        steps = drift + sigma * rng.standard_normal((horizon, n_paths))
+    else:
+        raise ValueError(f"Unknown projection method '{method}', expected one of {METHODS}")
+    np.cumsum(steps, axis=0, out=steps)
+    return np.exp(steps, out=steps).astype("float32")
+
+
+# -----------------------------
+# Process-pool workers
+# -----------------------------
+def _attach(name, shape):
+    block = shared_memory.SharedMemory(name=name)
+    return block, np.ndarray(shape, dtype="float32", buffer=block.buf)
+
+
+def _fill_chunk(name, shape, start, stop, returns, method, seed):
+    """Worker: simulate paths [start, stop) into the shared (horizon, n_paths) array."""
+    block, paths = _attach(name, shape)
+    try:
+        paths[:, start:stop] = simulate_growth(returns, stop - start, shape[0], method, seed)
+    finally:
+        del paths
+        block.close()
+
+
+def _band_rows(name, shape, start, stop, percentiles):
+    """Worker: percentiles over paths for days [start, stop)."""
+    block, paths = _attach(name, shape)
+    try:
+        return np.percentile(paths[start:stop], percentiles, axis=1)
+    finally:
+        del paths
+        block.close()
+
+
+_pools     = {}   # workers -> ProcessPoolExecutor, reused across projections
+_pool_lock = threading.Lock()
+
+
+def _pool(workers):
+    with _pool_lock:
+        pool = _pools.get(workers)
+        if pool is None:
+            method = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+            pool = _pools[workers] = ProcessPoolExecutor(max_workers=workers,
+                                                         mp_context=multiprocessing.get_context(method))
+        return pool
+
+
+def _discard_pool(workers):
+    with _pool_lock:
+        pool = _pools.pop(workers, None)
+    if pool is not None:
+        pool.shutdown(wait=False, cancel_futures=True)
+
+
+@atexit.register
+def shutdown_pools():
+    """Stop every worker pool (also run at interpreter exit)."""
+    for workers in list(_pools):
+        _discard_pool(workers)
+
+
+def _bands_parallel(returns, n_paths, horizon, method, seed, workers):
+    shape = (horizon, n_paths)
+    block = shared_memory.SharedMemory(create=True, size=int(np.prod(shape)) * 4)
+    pool = _pool(workers)
+    try:
+        seeds = np.random.SeedSequence(seed).spawn(-(-n_paths // PROJECTION_CHUNK))
+        fills = [pool.submit(_fill_chunk, block.name, shape, start,
+                             min(start + PROJECTION_CHUNK, n_paths), returns, method, child)
+                 for start, child in zip(range(0, n_paths, PROJECTION_CHUNK), seeds)]
+        for job in fills:
+            job.result()
+
+        day_step = -(-horizon // workers)
+        bands = [pool.submit(_band_rows, block.name, shape, start, min(start + day_step, horizon),
+                             PERCENTILES)
+                 for start in range(0, horizon, day_step)]
+        return np.concatenate([job.result() for job in bands], axis=1)
+    except BrokenProcessPool:
+        _discard_pool(workers)   # a worker died; the next run starts a fresh pool
+        raise
+    finally:
+        block.close()
+        block.unlink()
+
+
+def _bands_local(returns, n_paths, horizon, method, seed):
+    seeds = np.random.SeedSequence(seed).spawn(-(-n_paths // PROJECTION_CHUNK))
+    paths = np.empty((horizon, n_paths), dtype="float32")
+    for start, child in zip(range(0, n_paths, PROJECTION_CHUNK), seeds):
+        stop = min(start + PROJECTION_CHUNK, n_paths)
+        paths[:, start:stop] = simulate_growth(returns, stop - start, horizon, method, child)
+    return np.percentile(paths, PERCENTILES, axis=1)
+
+
+def project(history, amount, horizon=365, n_paths=10_000, method="bootstrap", seed=None,
+            workers=None, freq="D"):
+    """
+    Percentile bands for the value of `amount` invested at the last price of `history`.
+
+    history: [timestamp, price] frame (e.g. crypto_price_series / stock_price_series).
+    freq: step calendar, "D" for 24/7 crypto or "B" for stock trading days.
+    Returns a frame with timestamp and one p<N> column per entry of PERCENTILES,
+    starting with the current value at the last historical timestamp.
+    """
+    if method not in METHODS:
+        raise ValueError(f"Unknown projection method '{method}', expected one of {METHODS}")
+    returns = log_returns(history["price"])
+    if len(returns) < 2:
+        raise ValueError("Not enough price history to project from")
+
+    workers = workers or PROJECTION_WORKERS
+    if workers > 1 and n_paths >= PROJECTION_MIN_POOL:
+        bands = _bands_parallel(returns, n_paths, horizon, method, seed, workers)
+    else:
+        bands = _bands_local(returns, n_paths, horizon, method, seed)
+
+    last = pd.Timestamp(history["timestamp"].iloc[-1])
+    step = pd.tseries.frequencies.to_offset(freq)
+    out = pd.DataFrame({"timestamp": pd.DatetimeIndex([last]).append(
+        pd.date_range(last + step, periods=horizon, freq=freq))})
+    for q, band in zip(PERCENTILES, bands):
+        out[f"p{q}"] = np.concatenate([[1.0], band]) * amount
+    return out
@@ -0,0 +1,69 @@
+import numpy as np
+import pandas as pd
+
+
+def _asset_keys(df):
+    return df["asset_type"].astype(str).str.upper() + ":" + df["asset_code"].astype(str)
+
+
+def daily_grid(start, end, assets):
+    """One row per (day, asset): day, day_end (last instant of the day) and asset key."""
+    days = pd.date_range(pd.Timestamp(start).normalize(), pd.Timestamp(end).normalize(), freq="D")
+    grid = pd.DataFrame({
+        "day"  : np.repeat(days.to_numpy(), len(assets)),
+        "asset": np.tile(np.asarray(assets, dtype=object), len(days)),
+    })
+    grid["day_end"] = grid["day"] + pd.Timedelta(days=1) - pd.Timedelta(microseconds=1)
+    return grid
+
+
+def replay_portfolio(transactions, histories, end=None):
+    """
+    Daily value of a portfolio rebuilt from its transactions.
+
+    transactions: frame with asset_type, asset_code, in_out (1 buy / 0 sell),
+        quantity and timestamp_txn (e.g. table_transactions_crud.transactions_dataframe()).
+    histories: {(asset_type, asset_code): [timestamp, price] frame}, all in the
+        currency the result should be expressed in.
+
+    Holdings are a cumulative sum of signed quantities per asset; both holdings
+    and prices are aligned to the end of every calendar day with as-of joins,
+    so stock closes carry over weekends and holidays while 24/7 crypto uses its
+    last tick of the day. Returns a frame with timestamp, one value column per
+    asset type and total. Assets without a price yet are valued at 0.
+    """
+    if transactions.empty:
+        return pd.DataFrame(columns=["timestamp", "total"])
+
+    tx = pd.DataFrame({
+        "asset"    : _asset_keys(transactions).to_numpy(),
+        "timestamp": pd.to_datetime(transactions["timestamp_txn"]).to_numpy(dtype="datetime64[ns]"),
+        "signed"   : np.where(transactions["in_out"].to_numpy() == 1, 1.0, -1.0)
+                     * transactions["quantity"].to_numpy(dtype="float64"),
+    }).sort_values("timestamp", kind="stable")
+    tx["held"] = tx.groupby("asset", sort=False)["signed"].cumsum()
+
+    prices = pd.concat(
+        [pd.DataFrame({"asset": f"{asset_type.upper()}:{asset_code}",
+                       "timestamp": pd.to_datetime(frame["timestamp"]).to_numpy(dtype="datetime64[ns]"),
+                       "price": frame["price"].to_numpy(dtype="float64")})
+         for (asset_type, asset_code), frame in histories.items() if frame is not None and not frame.empty]
+        or [pd.DataFrame({"asset": pd.Series(dtype=object), "timestamp": pd.Series(dtype="datetime64[ns]"),
+                          "price": pd.Series(dtype="float64")})],
+        ignore_index=True
+    ).sort_values("timestamp", kind="stable")
+
+    end = pd.Timestamp(end) if end is not None else pd.Timestamp.today()
+    grid = daily_grid(tx["timestamp"].iloc[0], end, tx["asset"].unique()).sort_values("day_end", kind="stable")
+
+    grid = pd.merge_asof(grid, tx[["timestamp", "asset", "held"]], left_on="day_end", right_on="timestamp",
+                         by="asset", direction="backward").drop(columns="timestamp")
+    grid = pd.merge_asof(grid, prices, left_on="day_end", right_on="timestamp",
+                         by="asset", direction="backward").drop(columns="timestamp")
+    grid["value"] = (grid["held"].fillna(0.0) * grid["price"]).fillna(0.0)
+    grid["asset_type"] = grid["asset"].str.split(":", n=1).str[0]
+
+    out = grid.pivot_table(index="day", columns="asset_type", values="value", aggfunc="sum", fill_value=0.0)
+    out.columns.name = None
+    out["total"] = out.sum(axis=1)
+    return out.rename_axis("timestamp").reset_index()
@@ -0,0 +1,84 @@
+import numpy as np
+import pandas as pd
+
+# History window the simulators fetch, whatever the investment date. Keeping it
+# fixed means the price series is cached per (symbol, currency) only, and
+# changing the date or amount never triggers a new download. 365 is the most the
+# CoinGecko public API serves, and matches the earliest date the Simulator offers.
+SIMULATION_DAYS = 365
+
+
+def invest_indices(timestamps, invest_dates):
+    """Index of the first price on or after each investment date (len(timestamps) if none)."""
+    days = pd.to_datetime(pd.Series(timestamps)).dt.normalize().to_numpy()
+    dates = pd.to_datetime(pd.Series(invest_dates)).dt.normalize().to_numpy()
+    return np.searchsorted(days, dates, side="left")
+
+
+def simulate_curves(timestamps, prices, invest_dates, amounts):
+    """
+    Value of every investment over the whole price series, in one broadcast.
+
+    invest_dates / amounts: arrays of equal length (or a scalar amount).
+    Returns an (n_investments, n_prices) float64 array; entries before an
+    investment's first price are NaN, as is every entry of an investment
+    dated after the last price.
+    """
+    prices = np.asarray(prices, dtype="float64")
+    starts = invest_indices(timestamps, invest_dates)
+    amounts = np.broadcast_to(np.asarray(amounts, dtype="float64"), starts.shape)
+
+    if len(prices) == 0:
+        return np.empty((len(starts), 0), dtype="float64")
+
+    valid = starts < len(prices)
+    entry = np.where(valid, prices[np.minimum(starts, len(prices) - 1)], np.nan)
+    units = amounts / entry                                   # units bought by each investment
+    held = np.arange(len(prices))[None, :] >= starts[:, None]
+    return np.where(held, units[:, None] * prices[None, :], np.nan)
+
+
+# DCA step per frequency, counted from the first purchase rather than snapped to
+# calendar anchors (pd.date_range "W" lands on Sundays, "MS" on the 1st)
+DCA_STEPS = {"W": pd.DateOffset(weeks=1), "M": pd.DateOffset(months=1)}
+
+
+def dca_schedule(start, end, amount, freq="W"):
+    """
+    Dollar-cost-averaging plan: (dates, amounts) investing `amount` on `start`
+    and then every week ("W") or month ("M") after it, up to `end`.
+
+    Months are offset from the start date itself, so a plan started on the
+    31st buys on the last day of shorter months and is back on the 31st after.
+    """
+    start, end = pd.Timestamp(start).normalize(), pd.Timestamp(end).normalize()
+    count = max((end - start).days // (7 if freq == "W" else 28) + 1, 1)
+    dates = pd.DatetimeIndex([start + k * DCA_STEPS[freq] for k in range(count)])
+    dates = dates[(dates <= end) | (dates == start)]
+    return dates, np.full(len(dates), float(amount))
+
+
+def simulate_schedule(timestamps, prices, invest_dates, amounts):
+    """
+    Combined portfolio for a schedule of investments (e.g. from dca_schedule()).
+
+    Returns a frame with timestamp, price, invested (cumulative cash in) and portfolio_value.
+    """
+    curves = simulate_curves(timestamps, prices, invest_dates, amounts)
+    held = ~np.isnan(curves)
+    amounts = np.broadcast_to(np.asarray(amounts, dtype="float64"), (curves.shape[0],))
+    out = pd.DataFrame({"timestamp": pd.Series(timestamps).to_numpy(),
+                        "price": np.asarray(prices, dtype="float64")})
+    out["invested"] = (held * amounts[:, None]).sum(axis=0)
+    out["portfolio_value"] = np.nansum(curves, axis=0)
+    return out[out["invested"] > 0].reset_index(drop=True)
+
+
+def investment_curve(history, invest_date, amount):
+    """Single lump-sum curve as a [timestamp, price, portfolio_value] frame."""
+    if history.empty:
+        return pd.DataFrame(columns=["timestamp", "price", "portfolio_value"])
+    values = simulate_curves(history["timestamp"], history["price"], [invest_date], [amount])[0]
+    out = history[["timestamp", "price"]].reset_index(drop=True)
+    out["portfolio_value"] = values
+    return out.dropna(subset=["portfolio_value"]).reset_index(drop=True)
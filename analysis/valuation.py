@@ -0,0 +1,56 @@
+import numpy as np
+import pandas as pd
+
+
+def add_valuation(df, prices, fx_rates=None):
+    """
+    Add current_price, variation_% and current_value to a transaction frame.
+
+    prices: {(asset_type, asset_code): price or None}, e.g. from
+    data.fetch_api_quotes.get_current_prices(). Prices are joined with one
+    vectorized map; quantity and price are cast from Decimal to float64 so
+    the derived columns are whole-column numpy operations. Missing quotes
+    yield NaN.
+
+    fx_rates: optional per-row multipliers (e.g. data.fx.rates_for(df["currency"]))
+    that convert the quotes into each transaction's own currency.
+    """
+    out = df.copy()
+    keys = out["asset_type"].str.upper() + ":" + out["asset_code"].astype(str)
+    lookup = pd.Series(
+        {f"{asset_type.upper()}:{asset_code}": price for (asset_type, asset_code), price in prices.items()},
+        dtype="float64"
+    )
+
+    out["quantity"] = out["quantity"].astype("float64")
+    out["price"]    = out["price"].astype("float64")
+    out["current_price"] = keys.map(lookup).astype("float64")
+    if fx_rates is not None:
+        out["current_price"] *= fx_rates
+
+    buy_price = out["price"].to_numpy()
+    current   = out["current_price"].to_numpy()
+    with np.errstate(divide="ignore", invalid="ignore"):
+        variation = (current - buy_price) / buy_price * 100
+    variation[~np.isfinite(variation)] = np.nan
+
+    out["variation_%"]   = variation
+    out["current_value"] = current * out["quantity"].to_numpy()
+    return out
+
+
+def add_current_value(df):
+    """
+    Value a transaction frame at current quotes, as shown on the Historical page.
+
+    One batched quote lookup per distinct asset (USD), converted into each
+    row's currency, then add_valuation(); timestamp_txn is formatted for display.
+    """
+    from data import fx                                  # deferred: keeps analysis importable without the fetchers
+    from data.fetch_api_quotes import get_current_prices
+
+    keys = set(zip(df["asset_type"].str.upper(), df["asset_code"]))
+    prices = get_current_prices(tuple(sorted(keys)))
+    df_display = add_valuation(df, prices, fx_rates=fx.rates_for(df["currency"]))
+    df_display["timestamp_txn"] = df_display["timestamp_txn"].dt.strftime("%Y-%m-%d %H:%M")
+    return df_display
@@ -8,28 +8,13 @@ if os.getenv("RENDER") is None:
     load_dotenv()
 
 # Now import everything else
-import json
-from datetime import datetime
 import streamlit as st
 
-from data.table_users_crud import (
-    insert_users_ft,
-    fetch_user_seq_no,
-    fetch_all_users,
-    fetch_users_by_seq_no,
-    update_users,
-    delete_users,
-)
-
-from data.db_connection import get_connection
+from config_loader import load_config, CONFIG_PATH
+from data.table_users_crud import login_user
 
-# Connect to the database
-conn = get_connection()
-
-CONFIG_PATH = "config/config.json"
 if os.path.exists(CONFIG_PATH):
-    with open(CONFIG_PATH) as f:
-        config_json = json.load(f)
+    config_json = load_config()
 else:
     st.error("Missing configuration file: config/config.json")
     st.stop()
@@ -108,20 +93,6 @@ def is_valid_email(email: str) -> bool:
         return False
     return True
 
-def username_exists(username: str, email: str) -> bool:
-    username = username.strip()
-    email = email.strip().lower()
-    try:
-        for u in fetch_all_users():
-            db_username = u["username"].strip()
-            db_email    = u["email"].strip().lower()
-            if db_username == username and db_email == email:
-                return True
-        return False
-    except Exception as e:
-        st.error(f"Error checking username in DB: {e}")
-        return False
-
 # ==========================================================
 # 🧩 LOGIN UI
 # ==========================================================
@@ -141,19 +112,18 @@ if not current_username or not username_email:
         elif not is_valid_email(email):
             st.warning("Invalid e-mail format. Please enter a valid e-mail address.")
         else:
-            if username_exists(nickname, email):
-                st.session_state["current_username"] = nickname
-                st.session_state["username_email"]   = email
-                user_seq_no = fetch_user_seq_no(nickname, email)
-                st.session_state["user_seq_no"] = user_seq_no
-                st.success(f"Welcome back, {nickname}! Your account number is {user_seq_no}.")
-            else:
-                insert_users_ft(nickname, email)
-                st.session_state["current_username"] = nickname
-                st.session_state["username_email"]   = email
-                user_seq_no = fetch_user_seq_no(nickname, email)
-                st.session_state["user_seq_no"] = user_seq_no
+            try:
+                user_seq_no, created = login_user(nickname, email)
+            except Exception as e:
+                st.error(f"Error logging in: {e}")
+                st.stop()
+            st.session_state["current_username"] = nickname
+            st.session_state["username_email"]   = email
+            st.session_state["user_seq_no"]      = user_seq_no
+            if created:
                 st.success(f"Welcome, {nickname}! Your account number is {user_seq_no}.")
+            else:
+                st.success(f"Welcome back, {nickname}! Your account number is {user_seq_no}.")
 
 # ==========================================================
 # 🧾 SHOW USER + LOGOUT BUTTON
@@ -170,3 +140,11 @@ if current_username and username_email:
             st.session_state["current_username"] = None
             st.session_state["username_email"]   = None
             st.success("You have been logged out.")
+
+# ==========================================================
+# 🔄 BACKGROUND PRICE REFRESHER
+# ==========================================================
+# Imported last so the login form renders before the data stack loads;
+# start() only spawns the thread once per server process.
+from data import refresher
+refresher.start()
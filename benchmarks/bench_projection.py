@@ -0,0 +1,52 @@
+# ==========================================================
+# bench_projection.py
+# ==========================================================
+# Times analysis.projection.project() for both methods on a
+# synthetic year of daily prices, in process and across the
+# process pool (shared-memory paths, parallel percentile bands).
+#
+#   python -m benchmarks.bench_projection [paths] [horizon]
+# ==========================================================
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+from analysis.projection import METHODS, project
+
+
+def synthetic_history(days=365, seed=7):
+    """A year of daily prices with crypto-like volatility."""
+    rng = np.random.default_rng(seed)
+    prices = 30_000 * np.exp(np.cumsum(rng.normal(0.0005, 0.03, days)))
+    return pd.DataFrame({"timestamp": pd.date_range(end=pd.Timestamp.today().normalize(), periods=days),
+                         "price": prices})
+
+
+def timed(fn, runs=3):
+    best, result = float("inf"), None
+    for _ in range(runs):
+        started = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - started)
+    return best, result
+
+
+def main():
+    paths   = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    horizon = int(sys.argv[2]) if len(sys.argv) > 2 else 365
+    history = synthetic_history()
+    cores   = os.cpu_count() or 1
+
+    print(f"{paths:,} paths x {horizon} days, {cores} core(s)")
+    print(f"{'method':<12}{'workers':>9}{'best':>10}{'paths/s':>14}{'median end value':>20}")
+    for method in METHODS:
+        for workers in sorted({1, cores}):
+            seconds, bands = timed(lambda: project(history, 1_000, horizon, paths, method, seed=1, workers=workers))
+            print(f"{method:<12}{workers:>9}{seconds:>9.2f}s{paths / seconds:>14,.0f}{bands['p50'].iloc[-1]:>20,.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+# ==========================================================
+# bench_startup.py
+# ==========================================================
+# Cold-start import time per Streamlit page. Each page's top-level
+# imports are replayed in a fresh interpreter (no bytecode reuse
+# between pages beyond what is on disk), which is what a Render
+# cold boot pays before the first byte is rendered.
+#
+#   python -m benchmarks.bench_startup [--runs N] [--top K]
+# ==========================================================
+import argparse
+import ast
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT  = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PAGES = ["app.py"] + sorted(os.path.join("pages", p) for p in os.listdir(os.path.join(ROOT, "pages"))
+                            if p.endswith(".py"))
+
+CHILD = """
+import sys, time
+sys.path.insert(0, {root!r})
+started = time.perf_counter()
+{imports}
+print(time.perf_counter() - started)
+"""
+
+
+def page_imports(path):
+    """Return the source of every module-level import statement in a page."""
+    with open(os.path.join(ROOT, path)) as f:
+        source = f.read()
+    tree = ast.parse(source)
+    return "\n".join(ast.get_source_segment(source, node) for node in tree.body
+                     if isinstance(node, (ast.Import, ast.ImportFrom)))
+
+
+def cold_import_time(imports):
+    """Seconds spent importing `imports` in a brand-new interpreter."""
+    code = CHILD.format(root=ROOT, imports=imports)
+    out = subprocess.run([sys.executable, "-c", code], cwd=ROOT, capture_output=True, text=True, check=True)
+    return float(out.stdout.strip().splitlines()[-1])
+
+
+def heaviest_modules(imports, top):
+    """Top `top` modules by cumulative import time (python -X importtime)."""
+    code = CHILD.format(root=ROOT, imports=imports)
+    out = subprocess.run([sys.executable, "-X", "importtime", "-c", code], cwd=ROOT,
+                         capture_output=True, text=True, check=True)
+    rows = []
+    for line in out.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        # Nested imports are indented; keep the ones the page itself triggered
+        if not name[1:].startswith(" ") and name.strip() != "site":
+            rows.append((int(cumulative), name.strip()))
+    return sorted(rows, reverse=True)[:top]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--runs", type=int, default=5, help="cold interpreters per page")
+    parser.add_argument("--top", type=int, default=5, help="heaviest top-level modules to list")
+    args = parser.parse_args()
+
+    print(f"{'page':<34}{'median':>10}{'min':>10}")
+    for page in PAGES:
+        imports = page_imports(page)
+        times = [cold_import_time(imports) for _ in range(args.runs)]
+        print(f"{page:<34}{statistics.median(times):>9.3f}s{min(times):>9.3f}s")
+        for micros, name in heaviest_modules(imports, args.top):
+            print(f"    {name:<30}{micros / 1e6:>9.3f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+# ==========================================================
+# bench_valuation.py
+# ==========================================================
+# Compares the old row-wise add_current_value() (three
+# DataFrame.apply passes over Decimal values) with the vectorized
+# analysis.valuation.add_valuation() on a synthetic history.
+#
+#   python -m benchmarks.bench_valuation [rows]
+# ==========================================================
+import sys
+import time
+from decimal import Decimal
+
+import numpy as np
+import pandas as pd
+
+from analysis.valuation import add_valuation
+
+ASSETS = [("CRYPTO", c) for c in ["BTC", "ETH", "SOL", "ADA", "XRP", "DOGE", "DOT", "LTC"]] + \
+         [("STOCK", s) for s in ["AAPL", "AMD", "AMZN", "GOOGL", "IBM", "MSFT", "NVDA", "TSLA"]]
+
+
+def synthetic_transactions(rows, seed=42):
+    """Build a transaction frame shaped like fetch_all_user_transactions() output."""
+    rng = np.random.default_rng(seed)
+    picks = rng.integers(0, len(ASSETS), rows)
+    return pd.DataFrame({
+        "asset_type"   : [ASSETS[i][0] for i in picks],
+        "asset_code"   : [ASSETS[i][1] for i in picks],
+        "quantity"     : [Decimal(f"{q:.4f}") for q in rng.uniform(0.01, 100, rows)],
+        "price"        : [Decimal(f"{p:.2f}") for p in rng.uniform(1, 50_000, rows)],
+        "currency"     : "USD",
+        "timestamp_txn": pd.date_range("2020-01-01", periods=rows, freq="min"),
+    })
+
+
+def rowwise_valuation(df, prices):
+    """The pre-vectorization add_current_value(), with quotes served from a dict."""
+    df_display = df.copy()
+    df_display["current_price"] = df_display.apply(
+        lambda r: prices.get((r["asset_type"].upper(), r["asset_code"])), axis=1
+    )
+    df_display["variation_%"] = df_display.apply(
+        lambda r: ((float(r["current_price"])-float(r["price"]))/float(r["price"])*100)
+        if r["current_price"] is not None else None, axis=1
+    )
+    df_display["current_value"] = df_display.apply(
+        lambda r: float(r["current_price"])*float(r["quantity"]) if r["current_price"] else None, axis=1
+    )
+    return df_display
+
+
+def timed(fn, *args, repeat=3):
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = fn(*args)
+        best = min(best, time.perf_counter() - started)
+    return best, result
+
+
+def main(rows=100_000):
+    df = synthetic_transactions(rows)
+    prices = {asset: float(100 + i * 250) for i, asset in enumerate(ASSETS)}
+
+    t_old, old = timed(rowwise_valuation, df, prices, repeat=1)
+    t_new, new = timed(add_valuation, df, prices)
+
+    assert np.allclose(old["current_value"].astype(float), new["current_value"])
+    assert np.allclose(old["variation_%"].astype(float), new["variation_%"])
+
+    print(f"rows            : {rows:,}")
+    print(f"row-wise apply  : {t_old:8.3f} s")
+    print(f"vectorized      : {t_new:8.3f} s")
+    print(f"speed-up        : {t_old / t_new:8.1f}x")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 100_000)
@@ -0,0 +1,325 @@
+# ==========================================================
+# provider_standin.py
+# ==========================================================
+# Local HTTP stand-in for the upstream price APIs, so fetch paths
+# can be benchmarked and load-tested without a network:
+#
+#   /coingecko/api/v3/coins/<id>/market_chart   CoinGecko history
+#   /coingecko/api/v3/simple/price              CoinGecko quotes
+#   /yahoo/v8/finance/chart/<ticker>            Yahoo daily bars
+#   /fx/v6/latest/USD                           open.er-api FX table
+#   /_stats                                     requests served / 429s injected
+#
+# Responses are replayed from recordings (one JSON file per path and
+# query under --recordings); requests without a recording get a
+# deterministic synthetic payload of the same shape. --record proxies
+# to the real APIs once and stores what they return. Yahoo chart
+# queries carry an absolute period1/period2, so their recordings are
+# keyed without it and the bars are cut to the requested range on replay.
+#
+# Latency, 429 rate and payload size (--points per series) are
+# configurable. Point the app at it with
+#
+#   python -m benchmarks.provider_standin --port 8765 --latency-ms 80 --rate-429 0.05
+#   PROVIDER_STANDIN_URL=http://127.0.0.1:8765 streamlit run app.py
+# ==========================================================
+import argparse
+import gzip
+import hashlib
+import json
+import os
+import random
+import sys
+import threading
+import time
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit, parse_qsl
+
+import numpy as np
+import requests
+
+from data.http_client import BASE_URLS
+
+RECORDINGS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "recordings")
+BODY_CACHE_SIZE = 8      # encoded responses kept, so large payloads are built once
+BODY_CACHE_TTL  = 60     # seconds
+
+# Absolute time-range parameters: left out of recording keys, applied to the replayed payload instead
+RANGE_PARAMS = {"yahoo": ("period1", "period2")}
+
+FX_RATES = {"USD": 1.0, "EUR": 0.92, "GBP": 0.79, "JPY": 151.3, "CHF": 0.88, "CAD": 1.36,
+            "AUD": 1.52, "INR": 83.4, "CNY": 7.23, "BRL": 5.05, "MXN": 16.9, "SGD": 1.35}
+
+
+# -----------------------------
+# Synthetic payloads
+# -----------------------------
+def _walk(name, n, start=100.0):
+    """Deterministic positive random walk of n prices for an asset name."""
+    rng = np.random.default_rng(zlib.crc32(name.encode()))
+    steps = rng.normal(0.0002, 0.02, n)
+    return start * (1 + zlib.crc32(name.encode()) % 500) * np.exp(np.cumsum(steps))
+
+
+def market_chart(coin_id, query, points=None):
+    days = float(query.get("days", 30))
+    daily = query.get("interval") == "daily" or days > 90
+    n = points or max(int(days) + 1 if daily else int(days * 24), 2)
+    now_ms = int(time.time() // 3600 * 3600 * 1000)
+    stamps = np.linspace(now_ms - days * 86_400_000, now_ms, n).astype("int64")
+    prices = _walk(coin_id, n)
+    caps = prices * 19_000_000
+    volumes = prices * 350_000
+
+    def pairs(values):
+        return list(map(list, zip(stamps.tolist(), np.round(values, 6).tolist())))
+    return {"prices": pairs(prices), "market_caps": pairs(caps), "total_volumes": pairs(volumes)}
+
+
+def simple_price(query):
+    ids = [i for i in query.get("ids", "").split(",") if i]
+    currencies = [c for c in query.get("vs_currencies", "usd").split(",") if c]
+    return {coin_id: {cur: round(float(_walk(coin_id, 1)[-1]) / FX_RATES.get(cur.upper(), 1.0), 6)
+                      for cur in currencies}
+            for coin_id in ids}
+
+
+def yahoo_chart(ticker, query, points=None):
+    period2 = int(query.get("period2", time.time()))
+    period1 = int(query.get("period1", period2 - 365 * 86_400))
+    first = period2 // 86_400 - points * 7 // 5 - 7 if points else period1 // 86_400
+    days = np.arange(first, period2 // 86_400)
+    days = days[(days + 3) % 7 < 5][-points if points else 0:]   # 1970-01-01 was a Thursday: keep Mon-Fri
+    stamps = days * 86_400 + 14 * 3600 + 1800           # 14:30 UTC, the US market open
+    close = np.round(_walk(ticker, len(stamps)), 4)
+    return {"chart": {"result": [{
+        "meta": {"currency": "USD", "symbol": ticker, "dataGranularity": "1d"},
+        "timestamp": stamps.tolist(),
+        "indicators": {
+            "quote": [{"open": close.tolist(), "high": (close * 1.01).round(4).tolist(),
+                       "low": (close * 0.99).round(4).tolist(), "close": close.tolist(),
+                       "volume": [1_000_000] * len(close)}],
+            "adjclose": [{"adjclose": close.tolist()}],
+        },
+    }], "error": None}}
+
+
+def fx_table():
+    return {"result": "success", "base_code": "USD", "time_last_update_unix": int(time.time() // 86_400 * 86_400),
+            "rates": FX_RATES}
+
+
+def synthetic(provider, path, query, points=None):
+    """Synthetic payload for a stand-in path, or None if the path is not served."""
+    parts = path.strip("/").split("/")
+    if provider == "coingecko" and parts[:3] == ["api", "v3", "coins"] and parts[-1] == "market_chart":
+        return market_chart(parts[3], query, points)
+    if provider == "coingecko" and parts == ["api", "v3", "simple", "price"]:
+        return simple_price(query)
+    if provider == "yahoo" and parts[:3] == ["v8", "finance", "chart"] and len(parts) == 4:
+        return yahoo_chart(parts[3], query, points)
+    if provider == "fx" and parts == ["v6", "latest", "USD"]:
+        return fx_table()
+    return None
+
+
+# -----------------------------
+# Recordings
+# -----------------------------
+def recording_path(directory, provider, path, query):
+    keyed = sorted((k, v) for k, v in query.items() if k not in RANGE_PARAMS.get(provider, ()))
+    digest = hashlib.sha1(json.dumps([path, keyed]).encode()).hexdigest()[:16]
+    return os.path.join(directory, provider, f"{digest}.json")
+
+
+def slice_range(provider, payload, query):
+    """Cut a recorded Yahoo chart payload to the bars in [period1, period2); other payloads pass through."""
+    if provider != "yahoo" or not any(k in query for k in RANGE_PARAMS["yahoo"]):
+        return payload
+    results = (payload.get("chart") or {}).get("result") or []
+    if not results or not results[0].get("timestamp"):
+        return payload
+    stamps = np.asarray(results[0]["timestamp"])
+    keep = (stamps >= int(query.get("period1", 0))) & (stamps < int(query.get("period2", 2**62)))
+
+    def cut(values):
+        return np.asarray(values, dtype=object)[keep].tolist()
+    chart = dict(results[0], timestamp=stamps[keep].tolist())
+    chart["indicators"] = {name: [{field: cut(values) for field, values in series.items()} for series in blocks]
+                           for name, blocks in results[0].get("indicators", {}).items()}
+    return {"chart": dict(payload["chart"], result=[chart] + results[1:])}
+
+
+def record(directory, provider, path, query):
+    """Fetch the real response once and store it; returns (status, body bytes)."""
+    resp = requests.get(BASE_URLS[provider] + path, params=query, timeout=30,
+                        headers={"User-Agent": "Mozilla/5.0", "Accept": "application/json"})
+    target = recording_path(directory, provider, path, query)
+    if resp.status_code == 200:
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        with open(target, "w") as f:
+            json.dump({"path": path, "query": query, "body": resp.json()}, f)
+    return resp.status_code, resp.content
+
+
+# -----------------------------
+# Server
+# -----------------------------
+class StandinHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"   # keep-alive, like the real APIs
+
+    def log_message(self, *args):
+        pass
+
+    def _send(self, status, body, extra_headers=None, gzipped=None):
+        headers = {"Content-Type": "application/json"}
+        if body and "gzip" in self.headers.get("Accept-Encoding", ""):
+            body = gzipped or gzip.compress(body, compresslevel=1)
+            headers["Content-Encoding"] = "gzip"
+        headers.update(extra_headers or {})
+        self.send_response(status)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        opts = self.server.options
+        url = urlsplit(self.path)
+        if url.path == "/_stats":
+            return self._send(200, json.dumps(self.server.stats()).encode())
+
+        provider, _, rest = url.path.lstrip("/").partition("/")
+        if provider not in BASE_URLS:
+            return self._send(404, b'{"error": "unknown provider"}')
+        path, query = "/" + rest, dict(parse_qsl(url.query))
+        self.server.count(provider, "requests")
+
+        if opts.record:
+            status, body = record(opts.recordings, provider, path, query)
+            return self._send(status, body)
+
+        delay = opts.latency_ms + self.server.rng.uniform(0, opts.jitter_ms)
+        if delay:
+            time.sleep(delay / 1000)
+        if self.server.rng.random() < opts.rate_429:
+            self.server.count(provider, "throttled")
+            return self._send(429, b'{"status": {"error_code": 429, "error_message": "rate limited"}}',
+                              {"Retry-After": "1"})
+
+        response = self.server.response(provider, path, query)
+        if response is None:
+            return self._send(404, b'{"error": "no recording or synthetic route"}')
+        body, gzipped, etag = response
+        if self.headers.get("If-None-Match") == etag:
+            self.server.count(provider, "not_modified")
+            return self._send(304, b"", {"ETag": etag})
+        self._send(200, body, {"ETag": etag}, gzipped)
+
+
+class StandinServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, options):
+        super().__init__(address, StandinHandler)
+        self.options = options
+        self.rng = random.Random(options.seed)
+        self._counts = {}
+        self._bodies = {}          # (provider, path, query, points) -> (built at, recorded, body, gzipped, etag)
+        self._lock = threading.Lock()
+
+    def handle_error(self, request, client_address):
+        # A client that timed out on a large payload is expected under load; anything else is reported
+        if not isinstance(sys.exc_info()[1], (BrokenPipeError, ConnectionResetError)):
+            super().handle_error(request, client_address)
+
+    def response(self, provider, path, query):
+        """(body, gzipped body, etag) for a request, from a recording or synthesized; None if unknown."""
+        key = (provider, path, tuple(sorted(query.items())), self.options.points)
+        with self._lock:
+            cached = self._bodies.get(key)
+        if cached and time.monotonic() - cached[0] < BODY_CACHE_TTL:
+            if cached[1]:
+                self.count(provider, "replayed")
+            return cached[2:]
+
+        stored = recording_path(self.options.recordings, provider, path, query)
+        recorded = os.path.exists(stored)
+        if recorded:
+            with open(stored) as f:
+                payload = slice_range(provider, json.load(f)["body"], query)
+            self.count(provider, "replayed")
+        else:
+            payload = synthetic(provider, path, query, self.options.points)
+            if payload is None:
+                return None
+        body = json.dumps(payload, separators=(",", ":")).encode()
+        entry = (time.monotonic(), recorded, body, gzip.compress(body, compresslevel=1),
+                 '"' + hashlib.sha1(body).hexdigest()[:20] + '"')
+        with self._lock:
+            self._bodies[key] = entry
+            while len(self._bodies) > BODY_CACHE_SIZE:
+                self._bodies.pop(next(iter(self._bodies)))
+        return entry[2:]
+
+    def count(self, provider, field):
+        with self._lock:
+            counts = self._counts.setdefault(provider, {"requests": 0, "throttled": 0,
+                                                        "replayed": 0, "not_modified": 0})
+            counts[field] += 1
+
+    def stats(self):
+        with self._lock:
+            return {provider: dict(counts) for provider, counts in self._counts.items()}
+
+    @property
+    def url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Local stand-in for CoinGecko, Yahoo chart and open.er-api.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="fixed delay added to every response")
+    parser.add_argument("--jitter-ms", type=float, default=0.0, help="extra uniform random delay")
+    parser.add_argument("--rate-429", type=float, default=0.0, help="fraction of requests answered with 429")
+    parser.add_argument("--points", type=int, default=None, help="points per synthetic price series")
+    parser.add_argument("--recordings", default=RECORDINGS_DIR)
+    parser.add_argument("--record", action="store_true", help="proxy to the real APIs and store responses")
+    parser.add_argument("--seed", type=int, default=0)
+    return parser.parse_args(argv)
+
+
+def start(argv=None):
+    """
+    Start a stand-in on a background thread (e.g. from a benchmark) and return the server.
+
+    Takes the command-line options as a list; pass ["--port", "0"] for a free port.
+    """
+    options = parse_args(argv)
+    server = StandinServer((options.host, options.port), options)
+    threading.Thread(target=server.serve_forever, name="provider-standin", daemon=True).start()
+    return server
+
+
+def main():
+    options = parse_args()
+    server = StandinServer((options.host, options.port), options)
+    mode = "recording" if options.record else "replaying"
+    print(f"Provider stand-in {mode} on {server.url} "
+          f"(latency {options.latency_ms:.0f}+{options.jitter_ms:.0f}ms, 429 rate {options.rate_429:.0%})")
+    print(f"Run the app with PROVIDER_STANDIN_URL={server.url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
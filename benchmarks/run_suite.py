@@ -0,0 +1,414 @@
+# ==========================================================
+# run_suite.py
+# ==========================================================
+# Benchmark suite for the core paths, with results appended to a
+# JSON history so regressions between commits show up as numbers:
+#
+#   fetch       market_chart / chart parsing and cold fetch_crypto_data /
+#               fetch_stock_data against the provider stand-in
+#   indicators  vectorized, streaming and incremental indicator paths
+#   simulation  simulate_*_investment_curve (cold and warm) and DCA curves
+#   valuation   analysis.valuation.add_current_value() (the Historical page's table)
+#   crud        transaction / holding CRUD against a local Postgres, in a
+#               scratch schema that is dropped afterwards (skipped when no
+#               database is reachable)
+#
+#   python -m benchmarks.run_suite [--groups fetch,indicators] [--sizes 1000,10000] [--repeat 3]
+#
+# Each run prints the median per case next to the previous run's median
+# from the same history file.
+# ==========================================================
+import argparse
+import contextlib
+import io
+import json
+import logging
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+
+# Benchmarks must never touch the real price store or the real APIs
+os.environ.setdefault("PRICE_STORE_DIR", tempfile.mkdtemp(prefix="assetpulse_bench_store_"))
+os.environ.setdefault("BACKGROUND_REFRESH", "false")
+
+# Lift the per-provider request budgets, so cold cases time fetching rather than token-bucket sleeps
+for provider in ("COINGECKO", "YAHOO", "FX"):
+    os.environ.setdefault(f"FETCH_RATE_{provider}", "1000000")
+
+# Streamlit warns about running in bare mode on every cached call. It resets its logger
+# levels when it first reads its config, so the warnings are filtered rather than leveled;
+# the loggers are set up here, before the data modules import Streamlit and log through them.
+for bare_mode_logger in ("streamlit", "streamlit.runtime.caching.cache_data_api",
+                         "streamlit.runtime.scriptrunner_utils.script_run_context"):
+    logging.getLogger(bare_mode_logger).addFilter(lambda record: record.levelno >= logging.ERROR)
+
+from benchmarks import provider_standin
+from data import price_store, http_client, fetch_api_crypto, fetch_api_stock
+from analysis import indicators
+from analysis.indicators import IndicatorEngine, add_indicators, indicators_for, linear_trend
+from analysis.simulation import dca_schedule, simulate_schedule
+from analysis.valuation import add_valuation, add_current_value
+
+# Per-request INFO logs would drown the report
+logging.getLogger().setLevel(logging.WARNING)
+
+HISTORY_FILE    = os.path.join(os.path.dirname(os.path.abspath(__file__)), "history.json")
+DEFAULT_SIZES   = (1_000, 10_000, 100_000, 1_000_000)
+GROUPS          = ("fetch", "indicators", "simulation", "valuation", "crud")
+STOCK_MAX_BARS  = 50_000    # daily bars further back than ~190 years overflow datetime64[ns]
+SCHEDULE_MAX    = 100_000   # DCA curves are (investments x prices); keep them in memory
+CRUD_SCHEMA     = "bench_suite"
+CRUD_ROWS       = 20_000
+
+
+# -----------------------------
+# Timing
+# -----------------------------
+def measure(fn, repeat, setup=None):
+    """Run fn `repeat` times (setup() before each, untimed); returns the timings in seconds."""
+    timings = []
+    for _ in range(repeat):
+        if setup:
+            setup()
+        started = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - started)
+    return timings
+
+
+def summary(timings, **extra):
+    return {"median_s": statistics.median(timings), "min_s": min(timings), "runs": len(timings), **extra}
+
+
+@contextlib.contextmanager
+def quiet(errors):
+    """Silence the CRUD modules' print() output, collecting the errors they report (and swallow) into `errors`."""
+    buffer = io.StringIO()
+    try:
+        with contextlib.redirect_stdout(buffer):
+            yield
+    finally:
+        errors.extend(line for line in buffer.getvalue().splitlines() if line.startswith("Error"))
+
+
+# -----------------------------
+# Synthetic payloads
+# -----------------------------
+def random_walk(n, seed=0):
+    rng = np.random.default_rng(seed)
+    return 30_000 * np.exp(np.cumsum(rng.normal(0, 0.01, n)))
+
+
+def chart_payload(n):
+    """Yahoo v8 chart response with n one-minute bars (daily bars cannot reach 1M points)."""
+    stamps = (int(time.time()) - 60 * np.arange(n)[::-1]).tolist()
+    close = np.round(random_walk(n), 4).tolist()
+    return {"chart": {"result": [{"timestamp": stamps,
+                                  "indicators": {"quote": [{"close": close}], "adjclose": [{"adjclose": close}]}}]}}
+
+
+def yf_download_frame(n):
+    """A yf.download(group_by="column") result for one ticker with n rows."""
+    index = pd.date_range(end=pd.Timestamp.today().normalize(), periods=n, freq="min")
+    close = random_walk(n)
+    columns = pd.MultiIndex.from_product([["Close", "Open", "Volume"], ["AAPL"]], names=["Price", "Ticker"])
+    return pd.DataFrame(np.column_stack([close, close, np.full(n, 1e6)]), index=index, columns=columns)
+
+
+def transactions_frame(rows, seed=42):
+    """Frame shaped like table_transactions_crud.transactions_dataframe() output."""
+    rng = np.random.default_rng(seed)
+    assets = [("CRYPTO", c) for c in ["BTC", "ETH", "SOL", "ADA"]] + [("STOCK", s) for s in ["AAPL", "MSFT", "NVDA"]]
+    picks = rng.integers(0, len(assets), rows)
+    return pd.DataFrame({
+        "asset_type"   : pd.Categorical([assets[i][0] for i in picks]),
+        "asset_code"   : pd.Categorical([assets[i][1] for i in picks]),
+        "quantity"     : rng.uniform(0.01, 100, rows),
+        "price"        : rng.uniform(1, 50_000, rows),
+        "currency"     : pd.Categorical(rng.choice(["USD", "EUR", "GBP"], rows)),
+        "in_out"       : rng.integers(0, 2, rows),
+        "timestamp_txn": pd.date_range("2020-01-01", periods=rows, freq="min"),
+    })
+
+
+def reset_fetch_state():
+    """Forget everything fetched so far: store files, Streamlit caches, validators, indicator state."""
+    shutil.rmtree(price_store.STORE_DIR, ignore_errors=True)
+    for cached in (fetch_api_crypto.fetch_crypto_data, fetch_api_crypto.crypto_price_series,
+                   fetch_api_stock.fetch_stock_data, fetch_api_stock.stock_price_series):
+        cached.clear()
+    http_client.clear_validators()
+    with indicators._series_lock:
+        indicators._series.clear()
+
+
+# -----------------------------
+# Groups
+# -----------------------------
+def bench_fetch(standin, sizes, repeat):
+    results = {}
+    for n in sizes:
+        standin.options.points = n
+        market_chart = provider_standin.market_chart("bitcoin", {"days": 30}, points=n)
+        results[f"fetch.crypto_parse[{n}]"] = summary(
+            measure(lambda: fetch_api_crypto._prices_frame(market_chart), repeat))
+
+        chart = chart_payload(n)
+        results[f"fetch.stock_chart_parse[{n}]"] = summary(
+            measure(lambda: fetch_api_stock._chart_frame(chart), repeat))
+
+        frame = yf_download_frame(n)
+        results[f"fetch.stock_yf_split[{n}]"] = summary(
+            measure(lambda: fetch_api_stock._split_download(frame, ["AAPL"]), repeat))
+
+        # Untimed first call: the stand-in builds and caches the payload, so only the client side is timed
+        fetch_api_crypto.fetch_crypto_data("BTC", 30, "eur")
+        results[f"fetch.crypto_data_cold[{n}]"] = summary(
+            measure(lambda: fetch_api_crypto.fetch_crypto_data("BTC", 30, "eur"), repeat, reset_fetch_state))
+
+        bars = min(n, STOCK_MAX_BARS)
+        if f"fetch.stock_data_cold[{bars}]" in results:
+            continue
+        standin.options.points = bars
+        days = bars * 7 // 5 + 7
+        fetch_api_stock.fetch_stock_data("AAPL", days, "eur")
+        results[f"fetch.stock_data_cold[{bars}]"] = summary(
+            measure(lambda: fetch_api_stock.fetch_stock_data("AAPL", days, "eur"), repeat, reset_fetch_state))
+    standin.options.points = None
+    return results
+
+
+def bench_indicators(sizes, repeat):
+    results = {}
+    for n in sizes:
+        prices = random_walk(n)
+        history = pd.DataFrame({"timestamp": pd.date_range("2000-01-01", periods=n, freq="min"), "price": prices})
+        results[f"indicators.vectorized[{n}]"] = summary(
+            measure(lambda: add_indicators(pd.DataFrame({"price": prices})), repeat))
+        results[f"indicators.streaming[{n}]"] = summary(
+            measure(lambda: IndicatorEngine().extend(prices), repeat))
+
+        # Steady state of a refresh: the series grew by one point since the last call
+        key = ("bench", n)
+        def grow():
+            indicators_for(key, history.iloc[:-1])
+        results[f"indicators.incremental_append[{n}]"] = summary(
+            measure(lambda: indicators_for(key, history), repeat, grow))
+        results[f"indicators.linear_trend[{n}]"] = summary(measure(lambda: linear_trend(prices), repeat))
+    return results
+
+
+def bench_simulation(sizes, repeat):
+    results = {}
+    invest_date = datetime.today().date() - timedelta(days=180)
+    for name, simulate, symbol in (("crypto", fetch_api_crypto.simulate_crypto_investment_curve, "BTC"),
+                                   ("stock", fetch_api_stock.simulate_stock_investment_curve, "AAPL")):
+        results[f"simulation.{name}_curve_cold"] = summary(
+            measure(lambda: simulate(symbol, invest_date, 1_000, "eur"), repeat, reset_fetch_state))
+        simulate(symbol, invest_date, 1_000, "eur")
+        results[f"simulation.{name}_curve_warm"] = summary(
+            measure(lambda: simulate(symbol, invest_date, 1_000, "eur"), repeat))
+
+    for n in [n for n in sizes if n <= SCHEDULE_MAX]:
+        timestamps = pd.date_range(end=pd.Timestamp.today(), periods=n, freq="h")
+        prices = random_walk(n)
+        dates, amounts = dca_schedule(timestamps[0], timestamps[-1], 100, freq="W")
+        results[f"simulation.dca_schedule[{n}]"] = summary(
+            measure(lambda: simulate_schedule(timestamps, prices, dates, amounts), repeat),
+            investments=len(dates))
+    return results
+
+
+def bench_valuation(sizes, repeat):
+    results = {}
+    for n in sizes:
+        df = transactions_frame(n)
+        add_current_value(df)   # warm the quote table and FX, as on a refreshed page
+        results[f"valuation.add_current_value[{n}]"] = summary(measure(lambda: add_current_value(df), repeat))
+        results[f"valuation.add_valuation[{n}]"] = summary(
+            measure(lambda: add_valuation(df, {}, fx_rates=None), repeat))
+    return results
+
+
+def bench_crud(repeat):
+    """CRUD timings in a scratch schema; returns (results, reason skipped or None)."""
+    from sqlalchemy import create_engine, text
+    from db_scripts.migrate import DATABASE_URL, apply_migrations
+
+    # Route the app's pooled connections to the scratch schema as well
+    os.environ["PGOPTIONS"] = f"-c search_path={CRUD_SCHEMA}"
+    try:
+        from data import db_connection, table_transactions_crud as txn, table_holdings_crud as holdings
+        db_connection.get_pool()
+        engine = create_engine(DATABASE_URL, connect_args={"options": f"-c search_path={CRUD_SCHEMA}"})
+        with engine.begin() as conn:
+            conn.execute(text(f"DROP SCHEMA IF EXISTS {CRUD_SCHEMA} CASCADE; CREATE SCHEMA {CRUD_SCHEMA};"))
+    except Exception as e:
+        return {}, f"no database: {e}".splitlines()[0]
+
+    rng = np.random.default_rng(3)
+
+    def records(n, user=1):
+        return [{"portfolio_seq_no": 0, "in_out": int(rng.integers(0, 2)), "user_seq_no": user,
+                 "asset_type": "CRYPTO", "asset_code": str(rng.choice(["BTC", "ETH", "SOL"])),
+                 "quantity": round(float(rng.uniform(0.1, 10)), 4), "price": round(float(rng.uniform(10, 1000)), 2),
+                 "currency": "USD", "user_ins": "bench"} for _ in range(n)]
+
+    results, errors = {}, []
+    try:
+        apply_migrations(engine)
+        with quiet(errors):
+            for user in range(2, 2 + CRUD_ROWS // 10_000):
+                txn.insert_transactions_batch(records(10_000, user))
+            one = records(1)[0]
+            results["crud.insert_transaction"] = summary(measure(lambda: txn.insert_transaction(**one), repeat))
+            for n in (500, 10_000):
+                batch = records(n)
+                results[f"crud.insert_transactions_batch[{n}]"] = summary(
+                    measure(lambda: txn.insert_transactions_batch(batch), repeat))
+            with engine.begin() as conn:
+                conn.execute(text("ANALYZE transactions; ANALYZE holdings;"))
+                seq_no = conn.execute(text("SELECT max(seq_no) FROM transactions WHERE user_seq_no = 1")).scalar()
+
+            results["crud.fetch_all_user_transactions"] = summary(
+                measure(lambda: txn.fetch_all_user_transactions(1), repeat))
+            results["crud.stream_user_transactions_dataframe"] = summary(
+                measure(lambda: txn.transactions_dataframe(txn.stream_all_user_transactions(1)), repeat))
+            results["crud.fetch_transactions_by_user_asset"] = summary(
+                measure(lambda: txn.fetch_transactions_by_user_asset("BTC", 1), repeat))
+            results["crud.fetch_user_holdings"] = summary(measure(lambda: holdings.fetch_user_holdings(1), repeat))
+            results["crud.update_transaction"] = summary(
+                measure(lambda: txn.update_transaction(seq_no, {"quantity": 2}), repeat))
+            victims = iter(range(seq_no, 0, -1))
+            results["crud.delete_transaction"] = summary(
+                measure(lambda: txn.delete_transaction(next(victims)), repeat))
+    finally:
+        db_connection.close_pool()
+        with engine.begin() as conn:
+            conn.execute(text(f"DROP SCHEMA IF EXISTS {CRUD_SCHEMA} CASCADE;"))
+    if errors:
+        # A swallowed error returns early and would look like a fast call
+        return {}, f"{len(errors)} CRUD error(s), first: {errors[0]}"
+    return results, None
+
+
+# -----------------------------
+# History
+# -----------------------------
+def git_revision():
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=root,
+                                capture_output=True, text=True, check=True).stdout.strip()
+        dirty = bool(subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], cwd=root,
+                                    capture_output=True, text=True).stdout.strip())
+        return commit, dirty
+    except (OSError, subprocess.CalledProcessError):
+        return None, None
+
+
+def load_history(path):
+    if not os.path.exists(path):
+        return []
+    with open(path) as f:
+        return json.load(f)
+
+
+def previous_results(history, machine):
+    """Latest earlier result of every case measured on the same machine."""
+    merged = {}
+    for run in history:
+        if run.get("machine") == machine:
+            merged.update(run["results"])
+    return merged
+
+
+def report(results, previous):
+    print(f"{'case':<48} {'median':>10} {'previous':>10} {'change':>8}")
+    for case, result in results.items():
+        line = f"{case:<48} {result['median_s'] * 1000:>8.2f}ms"
+        before = previous.get(case)
+        if before:
+            change = (result["median_s"] / before["median_s"] - 1) * 100
+            line += f" {before['median_s'] * 1000:>8.2f}ms {change:>+7.1f}%"
+        print(line)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Time the core fetch, indicator, simulation, valuation and CRUD paths.")
+    parser.add_argument("--groups", default=",".join(GROUPS), help=f"comma-separated subset of {', '.join(GROUPS)}")
+    parser.add_argument("--sizes", default=",".join(map(str, DEFAULT_SIZES)), help="points / rows per sized case")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--history", default=HISTORY_FILE)
+    parser.add_argument("--no-save", action="store_true", help="print results without appending them")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    groups = [g for g in args.groups.split(",") if g]
+    unknown = set(groups) - set(GROUPS)
+    if unknown:
+        sys.exit(f"Unknown group(s): {', '.join(sorted(unknown))}")
+    sizes = [int(s) for s in args.sizes.split(",") if s]
+
+    standin = provider_standin.start(["--port", "0"])
+    os.environ["PROVIDER_STANDIN_URL"] = standin.url
+
+    results, skipped = {}, {}
+    started = time.perf_counter()
+    try:
+        if "fetch" in groups:
+            results.update(bench_fetch(standin, sizes, args.repeat))
+        if "indicators" in groups:
+            results.update(bench_indicators(sizes, args.repeat))
+        if "simulation" in groups:
+            results.update(bench_simulation(sizes, args.repeat))
+        if "valuation" in groups:
+            results.update(bench_valuation(sizes, args.repeat))
+        if "crud" in groups:
+            crud, reason = bench_crud(args.repeat)
+            results.update(crud)
+            if reason:
+                skipped["crud"] = reason
+    finally:
+        standin.shutdown()
+        shutil.rmtree(price_store.STORE_DIR, ignore_errors=True)
+
+    commit, dirty = git_revision()
+    run = {
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "commit"   : commit,
+        "dirty"    : dirty,
+        "machine"  : f"{platform.node()} {platform.machine()} {os.cpu_count()} cpu",
+        "python"   : platform.python_version(),
+        "pandas"   : pd.__version__,
+        "numpy"    : np.__version__,
+        "repeat"   : args.repeat,
+        "results"  : results,
+        "skipped"  : skipped,
+    }
+
+    history = load_history(args.history)
+    report(results, previous_results(history, run["machine"]))
+    for group, reason in skipped.items():
+        print(f"skipped {group}: {reason}")
+    print(f"Finished in {time.perf_counter() - started:.1f}s")
+    if not args.no_save:
+        history.append(run)
+        with open(args.history, "w") as f:
+            json.dump(history, f, indent=1)
+        print(f"Appended run {len(history)} ({commit}{'+' if dirty else ''}) to {args.history}")
+
+
+if __name__ == "__main__":
+    main()
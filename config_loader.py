@@ -0,0 +1,53 @@
+import json
+import os
+import threading
+
+CONFIG_PATH        = os.path.join(os.path.dirname(os.path.abspath(__file__)), "config", "config.json")
+USER_SETTINGS_PATH = os.path.join(os.path.dirname(CONFIG_PATH), "user_settings.json")   # saved by the Settings page
+
+_cache = {}                 # path -> (mtime, parsed config)
+_lock  = threading.Lock()
+
+
+def load_config(path=CONFIG_PATH):
+    """
+    Return the parsed config.json, re-reading it only when the file's mtime changes.
+
+    The returned dict is shared between callers; treat it as read-only.
+    Raises FileNotFoundError if the file is missing.
+    """
+    mtime = os.path.getmtime(path)
+    with _lock:
+        cached = _cache.get(path)
+        if cached is not None and cached[0] == mtime:
+            return cached[1]
+        with open(path) as f:
+            config = json.load(f)
+        _cache[path] = (mtime, config)
+        return config
+
+
+def load_user_settings():
+    """Return the settings saved from the Settings page ({} if none were saved or the file is unreadable)."""
+    try:
+        return load_config(USER_SETTINGS_PATH)
+    except (OSError, ValueError):
+        return {}
+
+
+def refresh_seconds():
+    """
+    Seconds between data refreshes: the Settings page's data_refresh_rate,
+    else DATA_REFRESH_RATE, else defaults.data_refresh_rate (minutes, at least 1).
+    """
+    minutes = (load_user_settings().get("data_refresh_rate") or os.getenv("DATA_REFRESH_RATE")
+               or load_config().get("defaults", {}).get("data_refresh_rate", 15))
+    return max(float(minutes), 1.0) * 60
+
+
+def cache_ttl(seconds):
+    """
+    Cap an st.cache_data TTL at the refresh interval. Decorators evaluate this once,
+    at import, so a refresh rate saved later applies to TTLs after a restart.
+    """
+    return int(min(seconds, refresh_seconds()))
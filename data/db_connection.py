@@ -3,16 +3,48 @@
 # ==========================================================
 # Handles PostgreSQL connections for both local Docker and Supabase.
 # Uses environment variables and automatically applies SSL for Supabase.
+# Connections are served from a process-wide pool so every query
+# reuses an already-open (and TLS-negotiated) connection.
 # ==========================================================
 import psycopg2
 import os
+import time
+import threading
+from contextlib import contextmanager
+from psycopg2 import pool
 from psycopg2.extras import RealDictCursor
 
 USE_SUPABASE = os.getenv("USE_SUPABASE", "false").lower() == "true"
 
-def get_connection():
+# --- Pool settings ---
+DB_POOL_MIN          = int(os.getenv("DB_POOL_MIN", 1))
+DB_POOL_MAX          = int(os.getenv("DB_POOL_MAX", 10))
+DB_POOL_TIMEOUT      = float(os.getenv("DB_POOL_TIMEOUT", 10))       # seconds to wait for a free connection
+DB_POOL_HEALTH_IDLE  = float(os.getenv("DB_POOL_HEALTH_IDLE", 30))   # ping connections idle longer than this
+
+_pool      = None
+_pool_lock = threading.Lock()
+_slots     = threading.BoundedSemaphore(DB_POOL_MAX)   # bounds concurrent checkouts; outlives pool rebuilds
+_last_used = {}                        # id(conn) -> time.monotonic() of last return
+_stats     = {
+    "checkouts"      : 0,
+    "returns"        : 0,
+    "health_checks"  : 0,
+    "discarded"      : 0,
+    "wait_time_total": 0.0,
+}
+_stats_lock = threading.Lock()         # counters are bumped from every thread that queries
+
+
+def _count(**deltas):
+    with _stats_lock:
+        for key, value in deltas.items():
+            _stats[key] += value
+
+
+def _connection_params():
     """
-    Return a PostgreSQL connection based on USE_SUPABASE flag.
+    Return PostgreSQL connection parameters based on USE_SUPABASE flag.
 
     - Local dev: Direct Connection or Docker
     - Render: Session Pooler (IPv4)
@@ -50,17 +82,134 @@ def get_connection():
     if not all([host, database, user, password]):
         raise ValueError("❌ Missing database credentials. Check environment variables.")
 
+    return dict(host=host, port=port, database=database, user=user,
+                password=password, sslmode=sslmode, cursor_factory=RealDictCursor)
+
+
+def get_pool():
+    """Create the process-wide connection pool on first use and return it."""
+    global _pool
+    if _pool is not None:
+        return _pool
+    with _pool_lock:
+        if _pool is None:
+            try:
+                _pool = pool.ThreadedConnectionPool(DB_POOL_MIN, DB_POOL_MAX, **_connection_params())
+            except psycopg2.Error as e:
+                raise ConnectionError(f"❌ Failed to connect to PostgreSQL: {e}")
+    return _pool
+
+
+def _is_healthy(conn):
+    """Check a pooled connection before handing it out."""
+    if conn.closed:
+        return False
+    idle = time.monotonic() - _last_used.get(id(conn), 0.0)
+    if idle < DB_POOL_HEALTH_IDLE:
+        return True
+    _count(health_checks=1)
+    try:
+        with conn.cursor() as cur:
+            cur.execute("SELECT 1")
+        conn.rollback()
+        return True
+    except psycopg2.Error:
+        return False
+
+
+def _checkout():
+    """Take a healthy connection from the pool, waiting up to DB_POOL_TIMEOUT seconds."""
+    p = get_pool()
+    started = time.monotonic()
+    if not _slots.acquire(timeout=DB_POOL_TIMEOUT):
+        raise ConnectionError(f"❌ No free database connection after {DB_POOL_TIMEOUT}s (pool max={DB_POOL_MAX}).")
+    _count(wait_time_total=time.monotonic() - started)
     try:
-        conn = psycopg2.connect(
-            host=host,
-            port=port,
-            database=database,
-            user=user,
-            password=password,
-            sslmode=sslmode,
-            cursor_factory=RealDictCursor
-        )
-        # print(f"✅ Connected to {'Supabase' if USE_SUPABASE else 'Local Docker'} database at {host}")
-        return conn
-    except psycopg2.Error as e:
-        raise ConnectionError(f"❌ Failed to connect to PostgreSQL: {e}")
\ No newline at end of file
+        while True:
+            conn = p.getconn()
+            if _is_healthy(conn):
+                _count(checkouts=1)
+                return conn
+            _count(discarded=1)
+            _last_used.pop(id(conn), None)
+            p.putconn(conn, close=True)
+    except Exception:
+        _slots.release()
+        raise
+
+
+def _release(conn):
+    """Return a connection to the pool, dropping it if it is broken."""
+    broken = bool(conn.closed)
+    if not broken:
+        try:
+            conn.rollback()            # never hand out a connection mid-transaction
+        except psycopg2.Error:
+            broken = True
+    if broken:
+        _count(discarded=1, returns=1)
+        _last_used.pop(id(conn), None)
+    else:
+        _count(returns=1)
+        _last_used[id(conn)] = time.monotonic()
+    try:
+        p = _pool
+        if p is None or id(conn) not in p._rused:
+            # The pool it came from was closed (close_pool()) while it was checked out
+            _last_used.pop(id(conn), None)
+            if not conn.closed:
+                conn.close()
+        else:
+            p.putconn(conn, close=broken)
+    finally:
+        _slots.release()
+
+
+@contextmanager
+def get_connection():
+    """
+    Check a PostgreSQL connection out of the pool.
+
+    Usage:
+        with get_connection() as conn:
+            with conn.cursor() as cur:
+                ...
+
+    The block is committed when it exits normally and rolled back on error;
+    either way the connection always goes back to the pool.
+    """
+    conn = _checkout()
+    try:
+        yield conn
+        conn.commit()
+    except Exception:
+        if not conn.closed:
+            conn.rollback()
+        raise
+    finally:
+        _release(conn)
+
+
+def pool_stats():
+    """Return a snapshot of pool usage counters."""
+    with _stats_lock:
+        stats = dict(_stats)
+    stats["min_size"] = DB_POOL_MIN
+    stats["max_size"] = DB_POOL_MAX
+    if _pool is None:
+        stats.update(open=0, idle=0, in_use=0)
+    else:
+        stats["idle"]   = len(_pool._pool)
+        stats["in_use"] = len(_pool._used)
+        stats["open"]   = stats["idle"] + stats["in_use"]
+    return stats
+
+
+def close_pool():
+    """Close every pooled connection (e.g. on shutdown or in scripts)."""
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.closeall()
+            _pool = None
+            _last_used.clear()
@@ -1,21 +1,19 @@
 import streamlit as st
-import requests
 import pandas as pd
 from datetime import datetime
 import logging
-import os
-import json
-import time
-from requests.exceptions import RequestException
+import math
+from config_loader import load_config, cache_ttl
+from data import price_store, fetch_engine, fx, http_client
+from analysis.indicators import indicators_for, PRICE_LEVEL_COLUMNS
+from analysis.simulation import SIMULATION_DAYS, investment_curve
 
 # --- Logging setup ---
 logging.basicConfig(level=logging.INFO,
                     format="%(asctime)s [%(levelname)s] %(message)s")
 
 # --- Load config ---
-config_path = os.path.join(os.path.dirname(os.path.dirname(__file__)), "config", "config.json")
-with open(config_path) as f:
-    config = json.load(f)
+config = load_config()
 
 COIN_MAP = config.get("coin_map", {})
 if not COIN_MAP:
@@ -25,128 +23,182 @@ if not COIN_MAP:
 # ================================
 # 🌐 Helper: Safe request with retry/backoff
 # ================================
-def safe_request(url, params=None, retries=5, base_delay=2):
-    """Retry GET request with exponential backoff on 429 or network error."""
-    for attempt in range(retries):
-        try:
-            resp = requests.get(url, params=params, timeout=10)
-            if resp.status_code == 429:
-                wait = base_delay * (2 ** attempt)
-                logging.warning(f"429 Too Many Requests -> retrying in {wait}s...")
-                time.sleep(wait)
-                continue
-            resp.raise_for_status()
-            return resp
-        except RequestException as e:
-            wait = base_delay * (2 ** attempt)
-            logging.warning(f"Request failed (attempt {attempt + 1}/{retries}): {e}. Retrying in {wait}s...")
-            time.sleep(wait)
-    logging.error(f"All retries failed for URL: {url}")
-    return None
-
-
-# ================================
-# 🌐 FX RATE FETCHER
-# ================================
-@st.cache_data(ttl=3600)
-def get_fx_rate(currency: str):
-    if currency.lower() == "usd":
-        return 1.0
-    try:
-        url = "https://open.er-api.com/v6/latest/USD"
-        resp = safe_request(url)
-        if not resp:
-            raise Exception("No response from FX API")
-        data = resp.json()
-        rate = data.get("rates", {}).get(currency.upper(), 1.0)
-        logging.info(f"get_fx_rate: USD -> {currency.upper()} = {rate}")
-        return rate
-    except Exception as e:
-        logging.error(f"Failed to fetch FX rate for {currency}, default 1.0: {e}")
-        return 1.0
+def safe_request(url, params=None, retries=5, base_delay=2, provider="coingecko"):
+    """Rate-limited GET with exponential backoff on 429 or network error (see fetch_engine)."""
+    return fetch_engine.request(provider, url, params=params, retries=retries, base_delay=base_delay)
 
 
 # ================================
 # 📈 CRYPTO DATA FETCHER
 # ================================
-def fetch_crypto_data(symbol, days, currency):
+def _download_crypto_prices(coin_id, days, interval):
+    """Download USD [timestamp, price] from CoinGecko; None if every retry failed."""
+    url = f"{http_client.base_url('coingecko')}/api/v3/coins/{coin_id}/market_chart"
+    params = {"vs_currency": "usd", "days": days}
+    if interval == "daily":
+        params["interval"] = "daily"
+
+    resp = fetch_engine.request("coingecko", url, params=params)
+    if resp is None:
+        logging.error(f"Failed to fetch crypto data for {coin_id}.")
+        return None
+
+    return _prices_frame(resp.json())
+
+
+def _prices_frame(payload):
+    """[timestamp, price] from a market_chart response ([[ms, price], ...] under "prices")."""
+    df = pd.DataFrame(payload.get("prices", []), columns=["timestamp", "price"])
+    df["timestamp"] = pd.to_datetime(df["timestamp"], unit="ms")
+    return df
+
+
+def _covers(history, window_start, step):
+    return not history.empty and history["timestamp"].iloc[0] <= window_start + step
+
+
+def _store_crypto_window(coin_id, days, interval, window_start, step):
+    """Download the whole window into the store unless it already covers it; returns the stored series."""
+    history = price_store.load_history("crypto", coin_id, "usd", interval)
+    if _covers(history, window_start, step):   # stored by a caller that finished after we looked
+        return history
+    fetched = _download_crypto_prices(coin_id, days, interval)
+    if fetched is not None:
+        history = price_store.append_history("crypto", coin_id, "usd", interval, fetched)
+    return history
+
+
+def _refresh_crypto_tail(coin_id, interval):
+    """
+    Download the points after the last stored one and append them to the store.
+
+    Concurrent calls for a series share one download and one append
+    (single_flight); a call that finds the store already refreshed returns it.
+    """
+    return fetch_engine.single_flight(("coingecko", coin_id, "usd", (interval, "tail")),
+                                      _store_crypto_tail, coin_id, interval)
+
+
+def _store_crypto_tail(coin_id, interval):
+    history = price_store.load_history("crypto", coin_id, "usd", interval)
+    if price_store.is_fresh("crypto", coin_id, "usd", interval):
+        return history
+    now = pd.Timestamp.now(tz="UTC").tz_localize(None)
+    missing_days = math.ceil((now - history["timestamp"].iloc[-1]) / pd.Timedelta(days=1))
+    # days=1 would switch CoinGecko to 5-minute points, so ask for at least 2 on hourly series
+    tail_days = max(missing_days, 1 if interval == "daily" else 2)
+    fetched = _download_crypto_prices(coin_id, tail_days, interval)
+    if fetched is not None:
+        history = price_store.append_history("crypto", coin_id, "usd", interval, fetched)
+    return history
+
+
+def _crypto_history(coin_id, days, background=True):
+    """
+    Stored USD history covering the last `days`, topped up from CoinGecko
+    only when the store is missing part of the window or is stale.
+
+    A stale but complete series is returned as is (stale-while-revalidate)
+    and its tail is refreshed on the fetch pool, unless background=False.
+    Only a store that cannot cover the window makes the caller wait.
+    Downloads run as one single_flight per series (download and append
+    together), and re-check the store first, so concurrent or late callers
+    neither download nor append the same points twice.
+
+    Returns (history, interval, window_start).
+    """
+    # CoinGecko serves hourly points up to 90 days and daily points beyond.
+    interval = "daily" if days > 90 else "hourly"
+    step = pd.Timedelta(days=1) if interval == "daily" else pd.Timedelta(hours=1)
+    now = pd.Timestamp.now(tz="UTC").tz_localize(None)
+    window_start = now - pd.Timedelta(days=days)
+
+    # Read the local store first, then fetch only what it is missing.
+    # The store keeps USD prices; other currencies are converted on read.
+    history = price_store.load_history("crypto", coin_id, "usd", interval)
+    if not _covers(history, window_start, step):
+        history = fetch_engine.single_flight(("coingecko", coin_id, "usd", (interval, days)),
+                                             _store_crypto_window, coin_id, days, interval, window_start, step)
+    elif not price_store.is_fresh("crypto", coin_id, "usd", interval):
+        if background:
+            fetch_engine.submit_once(("crypto", coin_id, interval), _refresh_crypto_tail, coin_id, interval)
+        else:
+            history = _refresh_crypto_tail(coin_id, interval)
+    return history, interval, window_start
+
+
+# Short TTL: reads are served from the local store, and a stale frame must not outlive its background refresh
+@st.cache_data(ttl=60)
+def fetch_crypto_data(symbol, days, currency, with_indicators=True):
+    """
+    Return crypto history for the last `days`, served from the local store.
+
+    with_indicators=False returns only [timestamp, price] so callers can
+    compute indicator columns lazily.
+    """
     symbol_upper = symbol.upper()
     coin_id = COIN_MAP.get(symbol_upper, symbol.lower())
     logging.info(f"Resolved coin_id: {coin_id}")
+    history, interval, window_start = _crypto_history(coin_id, days)
 
-    url = f"https://api.coingecko.com/api/v3/coins/{coin_id}/market_chart"
-    params = {"vs_currency": currency.lower(), "days": days}
-    
-    wait_time = 2
-    max_retries = 5
+    # Indicators run over the whole stored series and only new ticks are processed;
+    # they scale linearly with the FX rate, so currency is applied afterwards
+    df = indicators_for(("crypto", coin_id, interval), history) if with_indicators else history
+    df = df[df["timestamp"] >= window_start].reset_index(drop=True)
+    if df.empty:
+        logging.warning(f"No prices available for {symbol}")
+        if not with_indicators:
+            return price_store.empty_history()
+        return pd.DataFrame(columns=["timestamp", "price", "MA7", "MA30", "daily_change", "volatility"])
+
+    price_cols = PRICE_LEVEL_COLUMNS if with_indicators else ["price"]
+    df[price_cols] = fx.convert(df[price_cols], currency)
 
-    for attempt in range(max_retries):
-        try:
-            resp = requests.get(url, params=params, timeout=10)
-            
-            if resp.status_code == 429:
-                logging.warning(f"429 Too Many Requests -> retrying in {wait_time}s...")
-                time.sleep(wait_time)
-                wait_time *= 2
-                continue
+    logging.info(f"✅ Serving {len(df)} rows for {symbol}")
+    df = df.reset_index(drop=True)
+    df.attrs.update(price_store.freshness("crypto", coin_id, "usd", interval),
+                    provider="coingecko", refresh_key=("crypto", coin_id, interval))
+    return df
 
-            resp.raise_for_status()
-            data = resp.json().get("prices", [])
-            if not data:
-                logging.warning(f"No prices returned for {symbol}")
-                return pd.DataFrame(columns=["timestamp", "price", "MA7", "MA30", "daily_change", "volatility"])
 
-            df = pd.DataFrame(data, columns=["timestamp", "price"])
-            df["timestamp"] = pd.to_datetime(df["timestamp"], unit="ms")
-            if currency.lower() != "usd":
-                fx_rate = get_fx_rate(currency)
-                df["price"] *= fx_rate
 
-            df["MA7"] = df["price"].rolling(7, min_periods=1).mean()
-            df["MA30"] = df["price"].rolling(30, min_periods=1).mean()
-            df["daily_change"] = df["price"].pct_change() * 100
-            df["volatility"] = df["price"].rolling(7, min_periods=1).std()
+def fetch_crypto_batch(symbols, days, currency):
+    """Fetch several coins concurrently within the CoinGecko rate budget -> {symbol: frame}."""
+    return fetch_engine.map_assets(fetch_crypto_data, symbols, days, currency)
 
-            logging.info(f"✅ Fetched {len(df)} rows for {symbol}")
-            return df.reset_index(drop=True)
 
-        except requests.RequestException as e:
-            logging.error(f"Attempt {attempt+1} failed for {symbol}: {e}")
-            time.sleep(wait_time)
-            wait_time *= 2
+def _warm_coin(coin_id, days):
+    history, interval, _ = _crypto_history(coin_id, days, background=False)
+    indicators_for(("crypto", coin_id, interval), history)
+    return len(history)
 
-    logging.error(f"Failed to fetch crypto data for {symbol} ({coin_id}) after {max_retries} retries.")
-    return pd.DataFrame(columns=["timestamp", "price", "MA7", "MA30", "daily_change", "volatility"])
 
+def warm_crypto_store(symbols=None, days=None):
+    """Top up the local store (and indicator state) for every configured coin, concurrently."""
+    symbols = symbols or config.get("coins", [])
+    days = days or config.get("days", 30)
+    coin_ids = [COIN_MAP.get(s.upper(), s.lower()) for s in symbols]
+    return fetch_engine.map_assets(_warm_coin, coin_ids, days)
 
 
 # ================================
 # 📊 SIMULATE CRYPTO INVESTMENT
 # ================================
-@st.cache_data(ttl=3600)
+@st.cache_data(ttl=cache_ttl(3600))
+def crypto_price_series(symbol, currency):
+    """[timestamp, price] over SIMULATION_DAYS, cached per (symbol, currency) only."""
+    return fetch_crypto_data(symbol, SIMULATION_DAYS, currency, with_indicators=False)
+
+
 def simulate_crypto_investment_curve(symbol, invest_date, amount, currency):
     """Return portfolio evolution from invest_date until today."""
     today = datetime.today().date()
     invest_dt = invest_date.date() if isinstance(invest_date, datetime) else invest_date
-    days = (today - invest_dt).days
-    if days <= 0:
+    if (today - invest_dt).days <= 0:
         logging.warning("Investment date is today or in the future; cannot simulate.")
         return pd.DataFrame(columns=["timestamp","price","portfolio_value"])
 
-    df = fetch_crypto_data(symbol, days, currency)
-    if df.empty:
-        logging.warning(f"No data for {symbol}")
-        return pd.DataFrame(columns=["timestamp","price","portfolio_value"])
-
-    # Ensure timestamp is datetime
-    df["timestamp"] = pd.to_datetime(df["timestamp"], errors="coerce")
-    df = df.dropna(subset=["timestamp"])
-    df = df[df["timestamp"].dt.date >= invest_dt]
-
+    df = investment_curve(crypto_price_series(symbol, currency), invest_dt, amount)
     if df.empty:
         logging.warning(f"No data after {invest_dt} for {symbol}")
-        return pd.DataFrame(columns=["timestamp","price","portfolio_value"])
-
-    start_price = df["price"].iloc[0]
-    df["portfolio_value"] = amount * (df["price"] / start_price)
-    return df[["timestamp","price","portfolio_value"]]
\ No newline at end of file
+    return df
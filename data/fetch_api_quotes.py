@@ -0,0 +1,141 @@
+import streamlit as st
+import logging
+import os
+import threading
+import time
+from datetime import datetime, timedelta
+
+from config_loader import refresh_seconds
+from data import fetch_engine, fx, http_client, price_store
+from data.fetch_api_crypto import COIN_MAP, safe_request
+from data.fetch_api_stock import _split_download, _download_chart_prices
+
+# ==========================================================
+# 💲 CURRENT PRICE QUOTES (batched)
+# ==========================================================
+# One CoinGecko simple/price call for every coin and one yf.download
+# call for every stock, however many transactions reference them.
+#
+# USD quotes are also kept in a process-wide table that the background
+# refresher (data/refresher.py) keeps warm; lookups only go upstream for
+# assets missing from it or older than quote_max_age() seconds.
+QUOTE_MAX_AGE    = os.getenv("QUOTE_MAX_AGE")   # seconds; unset follows the refresh interval
+QUOTE_AGE_MARGIN = 300                          # covers the refresh cycle itself plus some slack
+
+_quotes      = {}   # (asset_type, asset_code) -> (usd_price, monotonic time fetched)
+_quotes_lock = threading.Lock()
+
+
+def quote_max_age():
+    """
+    Seconds a warm quote is served without refetching: one refresh interval plus a
+    margin, so quotes stay warm until the next background cycle has re-warmed them.
+    """
+    return int(QUOTE_MAX_AGE) if QUOTE_MAX_AGE else int(refresh_seconds()) + QUOTE_AGE_MARGIN
+
+
+def _crypto_quotes(codes):
+    """Return {code: USD price} for crypto symbols with one simple/price request."""
+    ids = {code: COIN_MAP.get(code.upper(), code.lower()) for code in codes}
+    coin_ids = ",".join(sorted(set(ids.values())))
+    resp = fetch_engine.single_flight(
+        ("coingecko", coin_ids, "usd", "spot"), safe_request,
+        f"{http_client.base_url('coingecko')}/api/v3/simple/price",
+        params={"ids": coin_ids, "vs_currencies": "usd"}
+    )
+    if resp is None:
+        logging.error(f"Failed to fetch crypto quotes for {', '.join(codes)}")
+        return {code: None for code in codes}
+
+    data = resp.json()
+    quotes = {}
+    for code, coin_id in ids.items():
+        price = data.get(coin_id, {}).get("usd")
+        quotes[code] = float(price) if price else None
+    return quotes
+
+
+def _stock_quotes(codes):
+    """Return {code: USD price} for stock tickers with one yf.download request."""
+    frames = fetch_engine.single_flight(("yahoo", tuple(sorted(codes)), "usd", "5d"), _download_quotes, codes)
+    if frames is None:
+        return {code: None for code in codes}
+    return {code: float(frame["price"].iloc[-1]) if not frame.empty else None
+            for code, frame in frames.items()}
+
+
+def _download_quotes(codes):
+    """Last few daily bars as {code: [timestamp, price]}, or None if Yahoo could not be reached."""
+    codes = list(codes)
+    if http_client.standin_url():
+        today = datetime.today().date()
+        return _download_chart_prices(codes, today - timedelta(days=7), today)
+
+    import yfinance as yf  # deferred: heavy import
+    circuit = fetch_engine.breaker("yahoo")
+    if not circuit.allow():
+        logging.warning("Circuit for yahoo is open, skipping stock quotes")
+        return None
+    fetch_engine.throttle("yahoo")
+    http_client.note_request("yahoo")
+    try:
+        df = yf.download(codes, period="5d", interval="1d",
+                         progress=False, auto_adjust=True, group_by="column",
+                         session=http_client.yahoo_session())
+    except Exception as e:
+        logging.error(f"Failed to fetch stock quotes for {', '.join(codes)}: {e}")
+        circuit.record_failure()
+        return None
+    circuit.record_success()
+    if df.empty:
+        return {code: price_store.empty_history() for code in codes}
+    return _split_download(df, codes)
+
+
+def _fetch_quotes(unique):
+    """Fetch USD quotes for a set of (ASSET_TYPE, code) pairs and record them in the warm table."""
+    coins  = sorted({code for asset_type, code in unique if asset_type == "CRYPTO"})
+    stocks = sorted({code for asset_type, code in unique if asset_type == "STOCK"})
+
+    # CoinGecko and Yahoo are independent providers, so query them at the same time
+    crypto_job = fetch_engine.submit(_crypto_quotes, coins) if coins else None
+    stock_job  = fetch_engine.submit(_stock_quotes, stocks) if stocks else None
+
+    prices = {}
+    if crypto_job:
+        prices.update({("CRYPTO", code): p for code, p in crypto_job.result().items()})
+    if stock_job:
+        prices.update({("STOCK", code): p for code, p in stock_job.result().items()})
+
+    now = time.monotonic()
+    with _quotes_lock:
+        _quotes.update({key: (p, now) for key, p in prices.items() if p is not None})
+    return prices
+
+
+def warm_quotes(assets):
+    """Refresh the warm quote table for every (asset_type, asset_code) pair."""
+    return _fetch_quotes({(asset_type.upper(), asset_code) for asset_type, asset_code in assets})
+
+
+# Short TTL: misses are served from the warm table, so this only saves the dict rebuild
+@st.cache_data(ttl=60)
+def get_current_prices(assets, currency="USD"):
+    """
+    Return {(asset_type, asset_code): price or None} for the given assets.
+
+    assets: iterable of (asset_type, asset_code) pairs, e.g. ("CRYPTO", "BTC").
+    Duplicates are collapsed, so cost scales with distinct assets only, and
+    quotes already warm in this process are not fetched again.
+    """
+    unique = {(asset_type.upper(), asset_code) for asset_type, asset_code in assets}
+    now, max_age = time.monotonic(), quote_max_age()
+    with _quotes_lock:
+        prices = {key: _quotes[key][0] for key in unique
+                  if key in _quotes and now - _quotes[key][1] <= max_age}
+    missing = unique - prices.keys()
+    if missing:
+        prices.update(_fetch_quotes(missing))
+
+    rate = fx.get_fx_rate(currency)
+    return {key: (p * rate if p is not None else None) for key, p in prices.items()}
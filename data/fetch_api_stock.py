@@ -1,12 +1,12 @@
 import streamlit as st
-import requests
 import pandas as pd
-import yfinance as yf
 from datetime import datetime, timedelta
 import logging
-import os
-import json
 import time
+from config_loader import load_config, cache_ttl
+from data import price_store, fetch_engine, fx, http_client
+from analysis.indicators import indicators_for, PRICE_LEVEL_COLUMNS
+from analysis.simulation import SIMULATION_DAYS, investment_curve
 
 # ==========================================================
 # 🧠 LOGGING SETUP
@@ -17,111 +17,276 @@ logging.basicConfig(level=logging.INFO,
 # ==========================================================
 # ⚙️ LOAD CONFIG
 # ==========================================================
-config_path = os.path.join(os.path.dirname(os.path.dirname(__file__)), "config", "config.json")
-with open(config_path) as f:
-    config = json.load(f)
-
-# ==========================================================
-# 🌐 FX RATE FETCHER
-# ==========================================================
-@st.cache_data(ttl=3600)
-def get_fx_rate(currency: str):
-    """Return USD->currency exchange rate (1.0 if USD)."""
-    if currency.lower() == "usd":
-        logging.info("get_fx_rate: USD -> USD (1.0)")
-        return 1.0
-
-    try:
-        url = "https://open.er-api.com/v6/latest/USD"
-        resp = requests.get(url, timeout=10).json()
-        rate = resp.get("rates", {}).get(currency.upper(), 1.0)
-        logging.info(f"get_fx_rate: USD -> {currency.upper()} = {rate}")
-        return rate
-    except Exception as e:
-        logging.error(f"Failed to fetch FX rate for {currency}, defaulting to 1.0: {e}")
-        return 1.0
+config = load_config()
 
 # ==========================================================
 # 💹 STOCK DATA FETCHER (Yahoo Finance)
 # ==========================================================
-@st.cache_data(ttl=3600)
-def fetch_stock_data(ticker, days, currency):
-    """Fetch historical stock data from Yahoo Finance with retry and rate-limit handling."""
-    end = datetime.today().date()
-    start = end - timedelta(days=days)
+def _split_download(df, tickers):
+    """Split a (possibly MultiIndex) yf.download result into {ticker: [timestamp, price]}."""
+    close = pd.DataFrame(index=df.index)
+    if isinstance(df.columns, pd.MultiIndex):
+        # Columns are (Price, Ticker); keep the adjusted close of every ticker
+        if "Close" in df.columns.get_level_values(0):
+            close = df["Close"]
+    elif "Close" in df.columns:
+        # Older yfinance returns flat columns for a single ticker
+        close = df[["Close"]].rename(columns={"Close": tickers[0]})
+
+    frames = {}
+    for ticker in tickers:
+        if ticker not in close.columns:
+            logging.warning(f"No Close column for {ticker}")
+            frames[ticker] = price_store.empty_history()
+            continue
+        series = close[ticker].dropna()
+        frames[ticker] = pd.DataFrame({"timestamp": pd.to_datetime(series.index),
+                                       "price"    : series.to_numpy(dtype="float64")})
+    return frames
+
+
+def _download_stock_prices(tickers, start, end, retry_empty=True):
+    """
+    Download daily bars (USD) for one or more tickers in a single yf.download call.
+
+    Returns {ticker: [timestamp, price]}, or None if every attempt failed.
+    An empty result is a valid answer for a short tail (weekend, holiday),
+    so only full windows retry on it.
+    """
+    download = _download_chart_prices if http_client.standin_url() else _request_stock_prices
+    return download(list(tickers), start, end, retry_empty)
+
+
+def _request_stock_prices(tickers, start, end, retry_empty):
+    import yfinance as yf  # deferred: heavy import, not needed when the store is fresh
+    label = ",".join(tickers)
     max_retries = 5
     wait_time = 2
+    circuit = fetch_engine.breaker("yahoo")
 
     for attempt in range(max_retries):
+        if not circuit.allow():
+            logging.warning(f"Circuit for yahoo is open, not downloading {label}")
+            return None
+        fetch_engine.throttle("yahoo")
+        http_client.note_request("yahoo")
         try:
             df = yf.download(
-                ticker, start=start, end=end + timedelta(days=1),
-                progress=False, auto_adjust=True
+                tickers, start=start, end=end + timedelta(days=1),
+                progress=False, auto_adjust=True, group_by="column",
+                session=http_client.yahoo_session()
             )
 
             if df.empty:
-                logging.warning(f"No data returned for {ticker} (attempt {attempt+1})")
+                if not retry_empty:
+                    circuit.record_success()
+                    return {t: price_store.empty_history() for t in tickers}
+                logging.warning(f"No data returned for {label} (attempt {attempt+1})")
+                circuit.record_failure()
                 time.sleep(wait_time)
                 continue
 
-            # Flatten MultiIndex if exists
-            if isinstance(df.columns, pd.MultiIndex):
-                df.columns = ["_".join(col).strip() if isinstance(col, tuple) else col for col in df.columns]
-
-            df.reset_index(inplace=True)
-            close_col = next((c for c in df.columns if "Close" in c), None)
-            if not close_col:
-                logging.warning(f"No Close column for {ticker}")
-                return pd.DataFrame(columns=["timestamp", "price", "MA7", "MA30", "daily_change", "volatility"])
-
-            df = df[["Date", close_col]].rename(columns={"Date": "timestamp", close_col: "price"})
-            df["timestamp"] = pd.to_datetime(df["timestamp"])
-
-            if not df.empty and currency.lower() != "usd":
-                fx_rate = get_fx_rate(currency)
-                df["price"] *= fx_rate
-
-            # Add indicators
-            df["MA7"] = df["price"].rolling(7, min_periods=1).mean()
-            df["MA30"] = df["price"].rolling(30, min_periods=1).mean()
-            df["daily_change"] = df["price"].pct_change() * 100
-            df["volatility"] = df["price"].rolling(7, min_periods=1).std()
-
-            logging.info(f"✅ Fetched {len(df)} rows for {ticker} from {start} to {end}")
-            return df.reset_index(drop=True)
+            circuit.record_success()
+            return _split_download(df, tickers)
 
         except yf.shared._exceptions.YFRateLimitError:
             logging.warning(f"⚠️ Rate limited by Yahoo Finance on attempt {attempt+1}. Retrying in {wait_time}s...")
-            time.sleep(wait_time)
+            circuit.record_failure()
+            fetch_engine.backoff("yahoo", wait_time)  # holds every Yahoo caller, not just this one
             wait_time *= 2  # Exponential backoff
         except Exception as e:
-            logging.error(f"Error fetching stock data for {ticker} (attempt {attempt+1}): {e}")
+            logging.error(f"Error fetching stock data for {label} (attempt {attempt+1}): {e}")
+            circuit.record_failure()
+            if circuit.state == "open":
+                break
             time.sleep(wait_time)
             wait_time *= 2
 
-    logging.error(f"❌ Failed to fetch stock data for {ticker} after {max_retries} attempts.")
-    return pd.DataFrame(columns=["timestamp", "price", "MA7", "MA30", "daily_change", "volatility"])
+    logging.error(f"❌ Failed to fetch stock data for {label} after {max_retries} attempts.")
+    return None
+
+
+def _chart_frame(payload):
+    """[timestamp, price] daily adjusted closes from a Yahoo v8 chart response."""
+    result = (payload.get("chart", {}).get("result") or [{}])[0]
+    indicators = result.get("indicators", {})
+    closes = (indicators.get("adjclose") or [{}])[0].get("adjclose") \
+        or (indicators.get("quote") or [{}])[0].get("close") or []
+    df = pd.DataFrame({"timestamp": pd.to_datetime(result.get("timestamp") or [], unit="s").normalize(),
+                       "price"    : pd.Series(closes, dtype="float64")})
+    return df.dropna().reset_index(drop=True)
+
+
+def _download_chart_prices(tickers, start, end, retry_empty=True):
+    """
+    Same contract as _download_stock_prices(), read from the Yahoo chart API
+    with one fetch_engine.request() per ticker. Used with the provider
+    stand-in, where yfinance cannot be redirected.
+    """
+    url = f"{http_client.base_url('yahoo')}/v8/finance/chart"
+    params = {"period1" : int(pd.Timestamp(start).timestamp()),
+              "period2" : int(pd.Timestamp(end + timedelta(days=1)).timestamp()),
+              "interval": "1d"}
+    frames = {}
+    for ticker in tickers:
+        resp = fetch_engine.request("yahoo", f"{url}/{ticker}", params=params)
+        if resp is None:
+            logging.error(f"❌ Failed to fetch chart data for {ticker}.")
+            return None
+        frames[ticker] = _chart_frame(resp.json())
+    return frames
+
+
+def _stock_frame(history, ticker, start, currency, with_indicators=True):
+    """Add indicators to a stored USD series, slice it to the window and convert currency."""
+    # Indicators run over the whole stored series and only new bars are processed
+    df = indicators_for(("stock", ticker, "daily"), history) if with_indicators else history
+    df = df[df["timestamp"].dt.date >= start].reset_index(drop=True)
+    if df.empty:
+        logging.warning(f"No stock data available for {ticker}")
+        if not with_indicators:
+            return price_store.empty_history()
+        return pd.DataFrame(columns=["timestamp", "price", "MA7", "MA30", "daily_change", "volatility"])
+
+    price_cols = PRICE_LEVEL_COLUMNS if with_indicators else ["price"]
+    df[price_cols] = fx.convert(df[price_cols], currency)
+    return df
+
+
+def _covers(history, start):
+    # Allow a few days of slack for weekends and market holidays at the window start
+    return not history.empty and history["timestamp"].iloc[0].date() <= start + timedelta(days=4)
+
+
+def _missing_from(history, ticker, start):
+    """First date to download for a window starting at `start`, or None if the store is complete and fresh."""
+    if not _covers(history, start):
+        return start
+    if not price_store.is_fresh("stock", ticker, "usd", "daily"):
+        # Re-fetch the last stored bar too: if it was saved during market hours it
+        # holds an intraday price, and append_history replaces it with the close
+        return history["timestamp"].iloc[-1].date()
+    return None
+
+
+def _sync_stocks(tickers, start, end):
+    """
+    Download what the store lacks for these tickers in one call, append it and
+    return {ticker: stored history}.
+
+    Concurrent calls for the same tickers and window share one download and one
+    append (single_flight); tickers another caller stored in the meantime are
+    re-read instead of downloaded again.
+    """
+    tickers = tuple(sorted(tickers))
+    return fetch_engine.single_flight(("yahoo", tickers, "usd", (start, end)),
+                                      _store_stock_bars, tickers, start, end)
+
+
+def _store_stock_bars(tickers, start, end):
+    histories = {t: price_store.load_history("stock", t, "usd", "daily") for t in tickers}
+    needed = {t: _missing_from(histories[t], t, start) for t in tickers}
+    to_fetch = []
+    for ticker, need_from in needed.items():
+        if need_from is None:
+            continue
+        if need_from > end:
+            histories[ticker] = price_store.append_history("stock", ticker, "usd", "daily", None)
+        else:
+            to_fetch.append(ticker)
+    if to_fetch:
+        full_window = any(needed[t] == start for t in to_fetch)
+        fetched = _download_stock_prices(to_fetch, min(needed[t] for t in to_fetch), end, retry_empty=full_window)
+        if fetched is not None:
+            for ticker in to_fetch:
+                histories[ticker] = price_store.append_history("stock", ticker, "usd", "daily", fetched[ticker])
+    return histories
+
+
+def _fetch_stocks(tickers, days, currency, with_indicators=True, background=True):
+    """
+    Serve every ticker from the local store. Tickers whose stored history
+    does not cover the window are downloaded together while the caller
+    waits; stale but complete ones are served as they are and topped up
+    with one background yf.download call (stale-while-revalidate), or
+    in the foreground when background=False.
+    """
+    tickers = list(dict.fromkeys(tickers))
+    end = datetime.today().date()
+    start = end - timedelta(days=days)
+
+    # Yahoo quotes these tickers in USD; the store keeps USD bars and FX is applied on read
+    histories = {t: price_store.load_history("stock", t, "usd", "daily") for t in tickers}
+
+    to_fetch, tails = [], []
+    for ticker, history in histories.items():
+        need_from = _missing_from(history, ticker, start)
+        if need_from is None:
+            continue
+        if need_from > end:
+            price_store.append_history("stock", ticker, "usd", "daily", None)
+        elif background and _covers(history, start):
+            tails.append(ticker)
+        else:
+            to_fetch.append(ticker)
+
+    refresh_key = ("stock", tuple(sorted(tails)))
+    if tails:
+        fetch_engine.submit_once(refresh_key, _sync_stocks, tails, start, end)
+
+    if to_fetch:
+        histories.update(_sync_stocks(to_fetch, start, end))
+
+    frames = {t: _stock_frame(histories[t], t, start, currency, with_indicators) for t in tickers}
+    for t, frame in frames.items():
+        frame.attrs.update(price_store.freshness("stock", t, "usd", "daily"),
+                           provider="yahoo", refresh_key=refresh_key if t in tails else None)
+    logging.info(f"✅ Serving {len(tickers)} tickers from {start} to {end} "
+                 f"({len(to_fetch)} refreshed in one request, {len(tails)} in the background)")
+    return frames
+
+
+# Short TTL so a stale frame is replaced soon after its background refresh lands
+@st.cache_data(ttl=cache_ttl(300))
+def fetch_stock_data(ticker, days, currency):
+    """Return historical stock data, served from the local store and topped up from Yahoo Finance."""
+    return _fetch_stocks([ticker], days, currency)[ticker]
+
+
+@st.cache_data(ttl=cache_ttl(300))
+def fetch_stocks_batch(tickers, days, currency, with_indicators=True):
+    """
+    Return {ticker: frame} for many tickers, downloading what is missing in one request.
+
+    with_indicators=False returns only [timestamp, price] per ticker.
+    """
+    return _fetch_stocks(tickers, days, currency, with_indicators)
+
+
+def warm_stock_store(tickers=None, days=None):
+    """Top up the local store for every configured stock with one upstream request."""
+    tickers = tickers or config.get("stocks", [])
+    days = days or config.get("days", 30)
+    _fetch_stocks(tickers, days, "usd", with_indicators=False, background=False)
 
 # ==========================================================
 # 💰 SIMULATE STOCK INVESTMENT CURVE
 # ==========================================================
-@st.cache_data(ttl=3600)
+@st.cache_data(ttl=cache_ttl(3600))
+def stock_price_series(ticker, currency):
+    """[timestamp, price] over SIMULATION_DAYS, cached per (ticker, currency) only."""
+    return _fetch_stocks([ticker], SIMULATION_DAYS, currency, with_indicators=False)[ticker]
+
+
 def simulate_stock_investment_curve(ticker, invest_date, amount, currency):
     """Simulate portfolio evolution from invest_date until today."""
     today = datetime.today().date()
     invest_dt = invest_date.date() if isinstance(invest_date, datetime) else invest_date
-    days = (today - invest_dt).days
-
-    if days <= 0:
+    if (today - invest_dt).days <= 0:
         logging.warning("Investment date is today or in the future; cannot simulate.")
         return pd.DataFrame(columns=["timestamp", "price", "portfolio_value"])
 
-    df = fetch_stock_data(ticker, days, currency)
-    df = df[df["timestamp"].dt.date >= invest_dt].copy()
+    df = investment_curve(stock_price_series(ticker, currency), invest_dt, amount)
     if df.empty:
         logging.warning(f"No data after {invest_dt} for {ticker}")
-        return pd.DataFrame(columns=["timestamp", "price", "portfolio_value"])
-
-    start_price = df["price"].iloc[0]
-    df["portfolio_value"] = amount * (df["price"] / start_price)
-    return df[["timestamp", "price", "portfolio_value"]]
+    return df
@@ -0,0 +1,293 @@
+# ==========================================================
+# fetch_engine.py
+# ==========================================================
+# Shared engine for upstream API calls:
+#   - a thread pool so many asset requests run at once
+#   - a token bucket per provider so we stay under free-tier limits
+#   - provider-wide backoff: a 429 pauses every caller of that
+#     provider instead of each request sleeping on its own
+#
+#   - a circuit breaker per provider: after repeated failures calls
+#     fail fast for a cooldown, then a single probe decides whether
+#     the provider is back
+#   - submit_once() for stale-while-revalidate background refreshes
+#   - single_flight(): concurrent callers asking for the same
+#     (provider, asset, currency, range) share one upstream call
+#
+# Both fetch modules go through submit()/map_assets() for
+# concurrency and through request()/throttle() for pacing; the
+# HTTP itself goes through data/http_client.py.
+# ==========================================================
+import os
+import time
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor, Future
+from requests.exceptions import RequestException
+
+from data import http_client
+
+FETCH_MAX_WORKERS = int(os.getenv("FETCH_MAX_WORKERS", 8))
+
+# Consecutive failures that open a provider's breaker, and how long it stays open (seconds)
+BREAKER_THRESHOLD = int(os.getenv("BREAKER_THRESHOLD", 3))
+BREAKER_COOLDOWN  = float(os.getenv("BREAKER_COOLDOWN", 120))
+
+# provider -> (requests per minute, burst)
+PROVIDER_LIMITS = {
+    "coingecko": (float(os.getenv("FETCH_RATE_COINGECKO", 25)), 5),
+    "yahoo"    : (float(os.getenv("FETCH_RATE_YAHOO", 60)), 10),
+    "fx"       : (float(os.getenv("FETCH_RATE_FX", 10)), 2),
+}
+
+
+class TokenBucket:
+    """Thread-safe token bucket refilled at `rate_per_min` up to `burst` tokens."""
+
+    def __init__(self, rate_per_min, burst):
+        self.rate = rate_per_min / 60.0
+        self.burst = burst
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+        self._blocked_until = 0.0
+        self._lock = threading.Lock()
+
+    def _refill(self, now):
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def acquire(self):
+        """Block until a token is available, then take it. Returns seconds waited."""
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._refill(now)
+                if now >= self._blocked_until and self._tokens >= 1:
+                    self._tokens -= 1
+                    return waited
+                delay = max(self._blocked_until - now, (1 - self._tokens) / self.rate)
+            time.sleep(delay)
+            waited += delay
+
+    def pause(self, seconds):
+        """Hold every caller for `seconds` (e.g. after a 429) and drop the burst."""
+        with self._lock:
+            self._blocked_until = max(self._blocked_until, time.monotonic() + seconds)
+            self._tokens = 0.0
+
+
+class CircuitBreaker:
+    """
+    closed -> open after `threshold` consecutive failures; open -> half-open after
+    `cooldown` seconds, where one probe call is let through: success closes the
+    breaker, failure re-opens it for another cooldown.
+    """
+
+    def __init__(self, name, threshold, cooldown):
+        self.name = name
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.state = "closed"
+        self.failures = 0
+        self.opened_at = 0.0
+        self._probing = False
+        self._lock = threading.Lock()
+
+    def allow(self):
+        """True if a call may go upstream now."""
+        with self._lock:
+            if self.state == "closed":
+                return True
+            if self.state == "open" and time.monotonic() - self.opened_at >= self.cooldown:
+                self.state = "half_open"
+            if self.state == "half_open" and not self._probing:
+                self._probing = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            if self.state != "closed":
+                logging.info(f"Circuit for {self.name} closed again")
+            self.state, self.failures, self._probing = "closed", 0, False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            self._probing = False
+            if self.state == "half_open" or self.failures >= self.threshold:
+                if self.state != "open":
+                    logging.warning(f"Circuit for {self.name} opened for {self.cooldown:.0f}s "
+                                    f"after {self.failures} failures")
+                self.state, self.opened_at = "open", time.monotonic()
+
+
+_buckets  = {name: TokenBucket(rate, burst) for name, (rate, burst) in PROVIDER_LIMITS.items()}
+_breakers = {name: CircuitBreaker(name, BREAKER_THRESHOLD, BREAKER_COOLDOWN) for name in PROVIDER_LIMITS}
+_executor = ThreadPoolExecutor(max_workers=FETCH_MAX_WORKERS, thread_name_prefix="fetch")
+
+
+def throttle(provider):
+    """Wait for the provider's rate budget before one upstream call."""
+    return _buckets[provider].acquire()
+
+
+def backoff(provider, seconds):
+    """Pause every request to `provider` for `seconds`."""
+    logging.warning(f"Backing off {provider} for {seconds}s")
+    _buckets[provider].pause(seconds)
+
+
+def breaker(provider):
+    """The provider's CircuitBreaker."""
+    return _breakers[provider]
+
+
+def available(provider):
+    """False while the provider's breaker is open (calls would fail fast)."""
+    b = _breakers[provider]
+    return b.state == "closed" or (b.state == "open" and time.monotonic() - b.opened_at >= b.cooldown)
+
+
+def request(provider, url, params=None, retries=5, base_delay=2, timeout=10):
+    """
+    Rate-limited GET with exponential backoff on 429, 5xx or network error.
+
+    Returns the response, or None once every retry has failed or while the
+    provider's circuit breaker is open. Any other 4xx (e.g. an unknown coin
+    id) returns None at once: the request itself is wrong, so it is not
+    retried and does not count against the provider's breaker.
+    """
+    circuit = _breakers[provider]
+    for attempt in range(retries):
+        if not circuit.allow():
+            logging.warning(f"Circuit for {provider} is open, not calling {url}")
+            return None
+        throttle(provider)
+        wait = base_delay * (2 ** attempt)
+        try:
+            resp = http_client.get(provider, url, params=params, timeout=timeout)
+            if resp.status_code == 429:
+                logging.warning(f"429 Too Many Requests from {provider} -> retrying in {wait}s...")
+                circuit.record_failure()
+                backoff(provider, wait)
+                continue
+            if 400 <= resp.status_code < 500:
+                logging.error(f"{provider} answered {resp.status_code} for {url}, not retrying")
+                circuit.record_success()   # the provider is up; only this request is bad
+                return None
+            resp.raise_for_status()
+            circuit.record_success()
+            return resp
+        except RequestException as e:
+            logging.warning(f"Request failed (attempt {attempt + 1}/{retries}): {e}. Retrying in {wait}s...")
+            circuit.record_failure()
+            if circuit.state == "open":
+                break
+            time.sleep(wait)
+    logging.error(f"All retries failed for URL: {url}")
+    return None
+
+
+def submit(fn, *args, **kwargs):
+    """Run fn(*args, **kwargs) on the fetch pool and return its Future."""
+    return _executor.submit(fn, *args, **kwargs)
+
+
+_inflight      = set()
+_inflight_lock = threading.Lock()
+
+
+def submit_once(key, fn, *args, **kwargs):
+    """
+    Run fn on the fetch pool unless a job with the same key is still running.
+
+    Used for background refreshes; returns the Future, or None if one was already in flight.
+    """
+    with _inflight_lock:
+        if key in _inflight:
+            return None
+        _inflight.add(key)
+
+    def run():
+        try:
+            return fn(*args, **kwargs)
+        except Exception as e:
+            logging.error(f"Background refresh {key} failed: {e}")
+        finally:
+            with _inflight_lock:
+                _inflight.discard(key)
+
+    return _executor.submit(run)
+
+
+def refreshing(key):
+    """True while a submit_once() job for key is running."""
+    with _inflight_lock:
+        return key in _inflight
+
+
+_flights      = {}   # key -> Future of the leader's call
+_flights_lock = threading.Lock()
+_flight_counts = {}  # provider -> {"upstream": n, "coalesced": n}
+
+
+def _count_flight(provider, outcome):
+    with _flights_lock:
+        counts = _flight_counts.setdefault(provider, {"upstream": 0, "coalesced": 0})
+        counts[outcome] += 1
+
+
+def single_flight(key, fn, *args, **kwargs):
+    """
+    Call fn(*args, **kwargs) once for every concurrent caller with the same key.
+
+    key is (provider, asset, currency, range). The first caller runs fn in its
+    own thread; callers arriving while it is in flight wait for it and get the
+    same result (or exception) instead of hitting the provider again. The
+    result is shared, so callers must not mutate it.
+    """
+    with _flights_lock:
+        flight = _flights.get(key)
+        leader = flight is None
+        if leader:
+            flight = _flights[key] = Future()
+    _count_flight(key[0], "upstream" if leader else "coalesced")
+    if not leader:
+        return flight.result()
+
+    try:
+        result = fn(*args, **kwargs)
+    except BaseException as e:
+        flight.set_exception(e)
+        raise
+    else:
+        flight.set_result(result)
+        return result
+    finally:
+        with _flights_lock:
+            _flights.pop(key, None)
+
+
+def flight_stats():
+    """{provider: {"upstream": calls made, "coalesced": calls that joined one in flight}}."""
+    with _flights_lock:
+        return {provider: dict(counts) for provider, counts in _flight_counts.items()}
+
+
+def map_assets(fn, assets, *args, **kwargs):
+    """
+    Call fn(asset, *args, **kwargs) for every asset concurrently.
+
+    Returns {asset: result}; an asset whose call raised maps to None.
+    """
+    futures = {asset: submit(fn, asset, *args, **kwargs) for asset in dict.fromkeys(assets)}
+    results = {}
+    for asset, future in futures.items():
+        try:
+            results[asset] = future.result()
+        except Exception as e:
+            logging.error(f"Fetch failed for {asset}: {e}")
+            results[asset] = None
+    return results
@@ -0,0 +1,65 @@
+# ==========================================================
+# fx.py
+# ==========================================================
+# One FX service for the whole app. The open.er-api USD table is
+# downloaded once per TTL and every rate in it is kept, so EUR,
+# GBP, ... all come from the same request. Conversions work on
+# scalars, Series and numpy arrays alike.
+# ==========================================================
+import logging
+import streamlit as st
+import pandas as pd
+
+from config_loader import cache_ttl
+from data import fetch_engine, http_client
+
+FX_PATH = "/v6/latest/USD"
+
+
+@st.cache_data(ttl=cache_ttl(3600))
+def get_fx_table():
+    """Return {CURRENCY: rate} for 1 USD. Raises (and is not cached) on failure."""
+    resp = fetch_engine.single_flight(("fx", "USD", "*", "latest"), fetch_engine.request,
+                                      "fx", http_client.base_url("fx") + FX_PATH)
+    if resp is None:
+        raise ConnectionError("No response from FX API")
+    rates = {code.upper(): float(rate) for code, rate in resp.json().get("rates", {}).items()}
+    rates["USD"] = 1.0
+    logging.info(f"FX table loaded: {len(rates)} currencies")
+    return rates
+
+
+def _table_or_empty():
+    try:
+        return get_fx_table()
+    except Exception as e:
+        logging.error(f"Failed to fetch FX table, defaulting to 1.0: {e}")
+        return {"USD": 1.0}
+
+
+def get_fx_rate(currency: str):
+    """Return USD->currency exchange rate (1.0 if USD or unknown)."""
+    if currency.lower() == "usd":
+        return 1.0
+    rate = _table_or_empty().get(currency.upper())
+    if rate is None:
+        logging.warning(f"No FX rate for {currency.upper()}, defaulting to 1.0")
+        return 1.0
+    return rate
+
+
+def convert(values, currency: str):
+    """Convert USD values (scalar, Series or ndarray) into `currency`."""
+    if currency.lower() == "usd":
+        return values
+    return values * get_fx_rate(currency)
+
+
+def rates_for(currencies):
+    """
+    Vectorized lookup: a Series of currency codes -> float64 array of
+    USD->code rates (1.0 where the code is unknown).
+    """
+    table = pd.Series(_table_or_empty(), dtype="float64")
+    codes = pd.Series(currencies).astype(str).str.upper()
+    return codes.map(table).fillna(1.0).to_numpy(dtype="float64")
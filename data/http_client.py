@@ -0,0 +1,197 @@
+# ==========================================================
+# http_client.py
+# ==========================================================
+# Shared HTTP client for every upstream provider:
+#   - one pooled requests.Session per provider, so repeat calls
+#     reuse the same TCP+TLS connection (keep-alive)
+#   - gzip/deflate responses
+#   - conditional GETs: ETag / Last-Modified from a previous 200 are
+#     sent back as If-None-Match / If-Modified-Since, and a 304 is
+#     answered from the stored body without re-downloading it;
+#     stored bodies are bounded by count and total bytes, and bodies
+#     above a per-response limit are not stored at all
+#   - per-provider and per-host counters (see stats())
+#
+# Yahoo is reached through yfinance, which only accepts a curl_cffi
+# session; yahoo_session() hands out one shared instance of it.
+#
+# PROVIDER_STANDIN_URL points every provider at the local stand-in
+# server (benchmarks/provider_standin.py) instead of the real APIs;
+# Yahoo is then read from its chart API directly, without yfinance.
+# ==========================================================
+import os
+import threading
+from collections import OrderedDict
+import requests
+from requests.adapters import HTTPAdapter
+
+HTTP_POOL_SIZE            = int(os.getenv("HTTP_POOL_SIZE", os.getenv("FETCH_MAX_WORKERS", 8)))
+HTTP_VALIDATOR_CACHE      = int(os.getenv("HTTP_VALIDATOR_CACHE", 256))   # stored bodies for revalidation
+HTTP_VALIDATOR_MAX_BYTES  = int(os.getenv("HTTP_VALIDATOR_MAX_BYTES", 64 * 1024 * 1024))   # their total size
+HTTP_VALIDATOR_MAX_BODY   = int(os.getenv("HTTP_VALIDATOR_MAX_BODY", 8 * 1024 * 1024))     # larger bodies are not stored
+
+BASE_URLS = {
+    "coingecko": "https://api.coingecko.com",
+    "yahoo"    : "https://query2.finance.yahoo.com",
+    "fx"       : "https://open.er-api.com",
+}
+
+DEFAULT_HEADERS = {
+    "Accept-Encoding": "gzip, deflate",
+    "Accept"         : "application/json",
+    "User-Agent"     : "AssetPulse/1.0 (+https://assetpulse.onrender.com)",
+}
+
+_sessions      = {}
+_yahoo_session = None
+_lock          = threading.Lock()
+
+_validators      = OrderedDict()   # (url, params) -> (etag, last_modified, content, encoding)
+_validator_bytes = 0               # total len(content) held in _validators
+_validators_lock = threading.Lock()
+
+_counters      = {}                # provider -> {requests, not_modified, bytes}
+_counters_lock = threading.Lock()
+
+
+def standin_url():
+    """Base URL of the provider stand-in server, or "" when the real APIs are used."""
+    return os.getenv("PROVIDER_STANDIN_URL", "").rstrip("/")
+
+
+def base_url(provider):
+    """Scheme and host for `provider`: the real API, or its prefix on the stand-in server."""
+    standin = standin_url()
+    return f"{standin}/{provider}" if standin else BASE_URLS[provider]
+
+
+def session(provider):
+    """The pooled keep-alive session for `provider`, created on first use."""
+    sess = _sessions.get(provider)
+    if sess is not None:
+        return sess
+    with _lock:
+        if provider not in _sessions:
+            sess = requests.Session()
+            adapter = HTTPAdapter(pool_connections=4, pool_maxsize=HTTP_POOL_SIZE)
+            sess.mount("https://", adapter)
+            sess.mount("http://", adapter)
+            sess.headers.update(DEFAULT_HEADERS)
+            _sessions[provider] = sess
+        return _sessions[provider]
+
+
+def yahoo_session():
+    """Shared curl_cffi session for yfinance (Yahoo rejects plain requests sessions)."""
+    global _yahoo_session
+    with _lock:
+        if _yahoo_session is None:
+            from curl_cffi import requests as curl_requests  # deferred: only needed for Yahoo
+            _yahoo_session = curl_requests.Session(impersonate="chrome")
+        return _yahoo_session
+
+
+def _count(provider, **deltas):
+    with _counters_lock:
+        counts = _counters.setdefault(provider, {"requests": 0, "not_modified": 0, "bytes": 0})
+        for key, value in deltas.items():
+            counts[key] += value
+
+
+def note_request(provider):
+    """Count a request made outside get() (e.g. through yfinance)."""
+    _count(provider, requests=1)
+
+
+def _cache_key(url, params):
+    return url, tuple(sorted((params or {}).items()))
+
+
+def _replay(resp, content, encoding):
+    """Turn a 304 into a 200 carrying the stored body."""
+    resp.status_code = 200
+    resp._content = content
+    resp.encoding = encoding
+    resp.from_cache = True
+    return resp
+
+
+def _store_validator(key, etag, last_modified, content, encoding):
+    """Keep a 200 body for revalidation, evicting least recently used entries past the count or byte budget."""
+    global _validator_bytes
+    with _validators_lock:
+        previous = _validators.pop(key, None)
+        if previous:
+            _validator_bytes -= len(previous[2])
+        if len(content) > HTTP_VALIDATOR_MAX_BODY:
+            return
+        _validators[key] = (etag, last_modified, content, encoding)
+        _validator_bytes += len(content)
+        while _validators and (len(_validators) > HTTP_VALIDATOR_CACHE or _validator_bytes > HTTP_VALIDATOR_MAX_BYTES):
+            _validator_bytes -= len(_validators.popitem(last=False)[1][2])
+
+
+def clear_validators():
+    """Forget every stored body, so the next request for each URL is a full download."""
+    global _validator_bytes
+    with _validators_lock:
+        _validators.clear()
+        _validator_bytes = 0
+
+
+def get(provider, url, params=None, timeout=10):
+    """
+    GET through the provider's pooled session, revalidating a stored copy when possible.
+
+    Returns the requests.Response (status 200 with the stored body after a 304);
+    network errors propagate as requests exceptions.
+    """
+    key = _cache_key(url, params)
+    with _validators_lock:
+        stored = _validators.get(key)
+    headers = {}
+    if stored:
+        etag, last_modified, _, _ = stored
+        if etag:
+            headers["If-None-Match"] = etag
+        if last_modified:
+            headers["If-Modified-Since"] = last_modified
+
+    resp = session(provider).get(url, params=params, headers=headers, timeout=timeout)
+    resp.from_cache = False
+
+    if resp.status_code == 304 and stored:
+        _count(provider, requests=1, not_modified=1)
+        return _replay(resp, stored[2], stored[3])
+
+    _count(provider, requests=1, bytes=len(resp.content))
+    etag, last_modified = resp.headers.get("ETag"), resp.headers.get("Last-Modified")
+    if resp.status_code == 200 and (etag or last_modified):
+        _store_validator(key, etag, last_modified, resp.content, resp.encoding)
+    return resp
+
+
+def host_stats():
+    """Per-host connection reuse: {host: {connections, requests, reused}} from the urllib3 pools."""
+    hosts = {}
+    for sess in list(_sessions.values()):
+        for adapter in set(sess.adapters.values()):
+            pools = adapter.poolmanager.pools
+            for pool_key in list(pools.keys()):
+                pool = pools.get(pool_key)
+                if pool is None:
+                    continue
+                entry = hosts.setdefault(pool.host, {"connections": 0, "requests": 0, "reused": 0})
+                entry["connections"] += pool.num_connections
+                entry["requests"]    += pool.num_requests
+                entry["reused"]      += max(pool.num_requests - pool.num_connections, 0)
+    return hosts
+
+
+def stats():
+    """Counters per provider (requests, not_modified, bytes), per host (see host_stats()) and stored bodies."""
+    with _counters_lock:
+        providers = {name: dict(counts) for name, counts in _counters.items()}
+    with _validators_lock:
+        validators = {"entries": len(_validators), "bytes": _validator_bytes}
+    return {"providers": providers, "hosts": host_stats(), "validators": validators}
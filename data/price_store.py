@@ -0,0 +1,129 @@
+# ==========================================================
+# price_store.py
+# ==========================================================
+# Persistent local price history, one Parquet partition per
+# asset / quote currency / bar interval:
+#
+#   cache/crypto_bitcoin_usd_hourly.parquet
+#   cache/stock_AAPL_usd_daily.parquet
+#
+# Fetchers read the partition first, download only the missing
+# tail since the last stored timestamp and append it atomically
+# (write to a temp file, then os.replace).
+# ==========================================================
+import os
+import threading
+import time
+import logging
+import pandas as pd
+
+from config_loader import refresh_seconds
+
+STORE_DIR = os.getenv(
+    "PRICE_STORE_DIR",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "cache")
+)
+
+# Don't ask upstream for a new tail more often than this (seconds) per interval.
+# Unset intervals follow the data refresh interval, so each background cycle
+# finds the store due and fetches the new tail.
+MIN_REFRESH = {
+    "hourly": os.getenv("PRICE_STORE_REFRESH_HOURLY"),
+    "daily" : os.getenv("PRICE_STORE_REFRESH_DAILY"),
+}
+
+
+def min_refresh(interval: str):
+    """Seconds a partition of this interval stays fresh."""
+    configured = MIN_REFRESH.get(interval)
+    return int(configured) if configured else refresh_seconds()
+
+COLUMNS = ["timestamp", "price"]
+
+_locks      = {}
+_locks_lock = threading.Lock()
+
+
+def _lock_for(path):
+    with _locks_lock:
+        return _locks.setdefault(path, threading.Lock())
+
+
+def partition_path(kind: str, asset: str, currency: str, interval: str):
+    """Return the Parquet file backing one (kind, asset, currency, interval) series."""
+    return os.path.join(STORE_DIR, f"{kind}_{asset}_{currency.lower()}_{interval}.parquet")
+
+
+def empty_history():
+    return pd.DataFrame({"timestamp": pd.Series(dtype="datetime64[ns]"),
+                         "price"    : pd.Series(dtype="float64")})
+
+
+def load_history(kind: str, asset: str, currency: str, interval: str):
+    """Return the stored [timestamp, price] series (empty frame if none)."""
+    path = partition_path(kind, asset, currency, interval)
+    if not os.path.exists(path):
+        return empty_history()
+    try:
+        return pd.read_parquet(path, columns=COLUMNS)
+    except Exception as e:
+        logging.warning(f"Unreadable price partition {path}, ignoring it: {e}")
+        return empty_history()
+
+
+def is_fresh(kind: str, asset: str, currency: str, interval: str):
+    """True if the partition was refreshed recently enough to skip upstream."""
+    path = partition_path(kind, asset, currency, interval)
+    if not os.path.exists(path):
+        return False
+    return time.time() - os.path.getmtime(path) < min_refresh(interval)
+
+
+def age(kind: str, asset: str, currency: str, interval: str):
+    """Seconds since the partition was last refreshed (None if it does not exist)."""
+    path = partition_path(kind, asset, currency, interval)
+    if not os.path.exists(path):
+        return None
+    return max(time.time() - os.path.getmtime(path), 0.0)
+
+
+def freshness(kind: str, asset: str, currency: str, interval: str):
+    """{"age_seconds", "stale"} for a partition, attached to served frames as DataFrame.attrs."""
+    return {"age_seconds": age(kind, asset, currency, interval),
+            "stale": not is_fresh(kind, asset, currency, interval)}
+
+
+def append_history(kind: str, asset: str, currency: str, interval: str, new_rows):
+    """
+    Merge new [timestamp, price] rows into the partition and return the full series.
+
+    The new rows replace every stored row from their first timestamp on:
+    upstream points do not land on the same instants twice (CoinGecko hourly
+    points drift by minutes and end with a moving "now" point), so matching
+    exact timestamps would leave near-duplicates behind. The file is replaced
+    atomically so readers never see a half-written partition. Appending an
+    empty frame just marks the partition as freshly checked.
+    """
+    path = partition_path(kind, asset, currency, interval)
+    with _lock_for(path):
+        stored = load_history(kind, asset, currency, interval)
+        if new_rows is None or new_rows.empty:
+            if os.path.exists(path):
+                os.utime(path)
+            return stored
+
+        new_rows = new_rows[COLUMNS].astype({"price": "float64"})
+        new_rows["timestamp"] = pd.to_datetime(new_rows["timestamp"])
+        stored = stored[stored["timestamp"] < new_rows["timestamp"].min()]
+        merged = (
+            pd.concat([stored, new_rows], ignore_index=True)
+              .drop_duplicates(subset="timestamp", keep="last")
+              .sort_values("timestamp")
+              .reset_index(drop=True)
+        )
+
+        os.makedirs(STORE_DIR, exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        merged.to_parquet(tmp_path, index=False)
+        os.replace(tmp_path, path)
+        return merged
@@ -0,0 +1,95 @@
+# ==========================================================
+# refresher.py
+# ==========================================================
+# Background refresher: one daemon thread per server process that
+# keeps the price store, indicator state, FX table and current
+# quotes warm for every coin and stock in config/config.json.
+#
+# It runs every `data_refresh_rate` minutes (the Settings page's
+# user_settings.json, else DATA_REFRESH_RATE, else config defaults),
+# re-reading both each cycle so changes apply on the next pass.
+# Pages call start() on load; only the first call starts a thread.
+# ==========================================================
+import os
+import time
+import logging
+import threading
+
+from config_loader import load_config, refresh_seconds
+from analysis.simulation import SIMULATION_DAYS
+from data import fx
+from data.fetch_api_crypto import warm_crypto_store
+from data.fetch_api_stock import warm_stock_store
+from data.fetch_api_quotes import warm_quotes
+
+REFRESH_ENABLED = os.getenv("BACKGROUND_REFRESH", "true").lower() == "true"
+
+_thread = None
+_lock   = threading.Lock()
+_stop   = threading.Event()
+_status = {"runs": 0, "errors": 0, "last_run": None, "last_seconds": None, "interval": None}
+
+
+def refresh_interval():
+    """Seconds between refresh cycles."""
+    return refresh_seconds()
+
+
+def refresh_once():
+    """Warm every configured asset once. Each step is independent, so one failing provider does not stop the rest."""
+    config = load_config()
+    coins  = config.get("coins", [])
+    stocks = config.get("stocks", [])
+    days   = int(os.getenv("DAYS", config.get("days", 30)))   # same window as the Dashboard
+
+    steps = [
+        ("fx"                 , lambda: fx.get_fx_table()),
+        ("crypto history"     , lambda: warm_crypto_store(coins, days)),               # Dashboard window (hourly)
+        ("crypto history 1y"  , lambda: warm_crypto_store(coins, SIMULATION_DAYS)),    # Simulator window (daily)
+        ("stock history"      , lambda: warm_stock_store(stocks, max(days, SIMULATION_DAYS))),
+        ("quotes"             , lambda: warm_quotes([("CRYPTO", c.upper()) for c in coins] +
+                                                    [("STOCK", s) for s in stocks])),
+    ]
+    started = time.perf_counter()
+    errors = 0
+    for name, step in steps:
+        try:
+            step()
+        except Exception as e:
+            errors += 1
+            logging.error(f"Background refresh of {name} failed: {e}")
+    seconds = time.perf_counter() - started
+    _status.update(runs=_status["runs"] + 1, errors=_status["errors"] + errors,
+                   last_run=time.time(), last_seconds=seconds)
+    logging.info(f"Background refresh done in {seconds:.1f}s ({len(coins)} coins, {len(stocks)} stocks)")
+
+
+def _run():
+    while not _stop.is_set():
+        refresh_once()
+        _status["interval"] = refresh_interval()
+        _stop.wait(_status["interval"])
+
+
+def start():
+    """Start the refresher thread for this process (no-op if it is running or disabled)."""
+    global _thread
+    if not REFRESH_ENABLED:
+        return False
+    with _lock:
+        if _thread is None or not _thread.is_alive():
+            _stop.clear()
+            _thread = threading.Thread(target=_run, name="price-refresher", daemon=True)
+            _thread.start()
+            logging.info("Background price refresher started")
+    return True
+
+
+def stop():
+    """Ask the refresher thread to exit after the current cycle."""
+    _stop.set()
+
+
+def status():
+    """Snapshot of refresher counters (runs, errors, last_run epoch, last_seconds, interval)."""
+    return dict(_status, alive=_thread is not None and _thread.is_alive())
@@ -0,0 +1,113 @@
+# table_holdings_crud.py
+from decimal import Decimal
+from psycopg2.extras import execute_values
+from data.db_connection import get_connection
+
+# The holdings table (db_scripts/create_table_holdings.py) keeps one row per
+# (user_seq_no, asset_type, asset_code, currency). table_transactions_crud
+# calls the helpers below on its own cursor, so a holding always changes in
+# the same database transaction as the trades behind it.
+
+HOLDING_KEY = ("user_seq_no", "asset_type", "asset_code", "currency")
+
+# -----------------------------
+# MAINTENANCE (called from table_transactions_crud)
+# -----------------------------
+
+def holding_deltas(records: list, timestamp_txn):
+    """
+    Aggregate transaction records into one delta row per holding key:
+    (user_seq_no, asset_type, asset_code, currency, quantity, bought_qty, bought_cost, last_txn).
+
+    Rows come back sorted by key so concurrent writers lock holdings in the same order.
+    """
+    deltas = {}
+    for rec in records:
+        key = tuple(rec[col] for col in HOLDING_KEY)
+        quantity = Decimal(str(rec["quantity"]))
+        price    = Decimal(str(rec["price"]))
+        net, bought, cost = deltas.get(key, (Decimal(0), Decimal(0), Decimal(0)))
+        if rec["in_out"] == 1:
+            deltas[key] = (net + quantity, bought + quantity, cost + quantity * price)
+        else:
+            deltas[key] = (net - quantity, bought, cost)
+    return [key + values + (timestamp_txn,) for key, values in sorted(deltas.items())]
+
+
+def apply_holding_deltas(cur, deltas: list):
+    """Upsert delta rows from holding_deltas() into holdings."""
+    if not deltas:
+        return
+    execute_values(
+        cur,
+        """
+        INSERT INTO holdings
+        (user_seq_no, asset_type, asset_code, currency, quantity, bought_qty, bought_cost, last_txn)
+        VALUES %s
+        ON CONFLICT (user_seq_no, asset_type, asset_code, currency) DO UPDATE SET
+            quantity    = holdings.quantity    + EXCLUDED.quantity,
+            bought_qty  = holdings.bought_qty  + EXCLUDED.bought_qty,
+            bought_cost = holdings.bought_cost + EXCLUDED.bought_cost,
+            last_txn    = GREATEST(holdings.last_txn, EXCLUDED.last_txn)
+        """,
+        deltas
+    )
+
+
+def rebuild_holding(cur, key: tuple):
+    """Recompute one holding from its transactions (after an update or delete)."""
+    cur.execute(
+        """
+        DELETE FROM holdings
+        WHERE user_seq_no = %s AND asset_type = %s AND asset_code = %s AND currency = %s
+        """,
+        key
+    )
+    cur.execute(
+        """
+        INSERT INTO holdings
+        (user_seq_no, asset_type, asset_code, currency, quantity, bought_qty, bought_cost, last_txn)
+        SELECT user_seq_no, asset_type, asset_code, currency,
+               SUM(CASE WHEN in_out = 1 THEN quantity ELSE -quantity END),
+               SUM(CASE WHEN in_out = 1 THEN quantity ELSE 0 END),
+               SUM(CASE WHEN in_out = 1 THEN quantity * price ELSE 0 END),
+               MAX(timestamp_txn)
+        FROM transactions
+        WHERE user_seq_no = %s AND asset_type = %s AND asset_code = %s AND currency = %s
+        GROUP BY user_seq_no, asset_type, asset_code, currency
+        """,
+        key
+    )
+
+
+# -----------------------------
+# SELECT FUNCTIONS
+# -----------------------------
+
+def fetch_user_holdings(user_seq_no: int, asset_code: str = None, include_closed: bool = False):
+    """
+    Fetch a user's positions (optionally for one asset) with a single primary-key lookup.
+
+    Each row has quantity, avg_cost (average buy price) and last_txn.
+    Positions with zero net quantity are skipped unless include_closed is set.
+    """
+    query = """
+        SELECT user_seq_no, asset_type, asset_code, currency, quantity,
+               bought_cost / NULLIF(bought_qty, 0) AS avg_cost, last_txn
+        FROM holdings
+        WHERE user_seq_no = %s
+    """
+    params = [user_seq_no]
+    if asset_code is not None:
+        query += " AND asset_code = %s"
+        params.append(asset_code)
+    if not include_closed:
+        query += " AND quantity <> 0"
+    query += " ORDER BY asset_type, asset_code, currency"
+    try:
+        with get_connection() as conn, conn.cursor() as cur:
+            cur.execute(query, tuple(params))
+            return cur.fetchall()
+    except Exception as e:
+        print(f"Error fetching holdings for user_seq_no={user_seq_no}: {e}")
+        return []
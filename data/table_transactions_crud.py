@@ -1,6 +1,16 @@
 # table_transactions_crud.py
+import csv
+import io
+import itertools
+import os
+import time
 from datetime import datetime
+import pandas as pd
+from pandas.api.types import union_categoricals
+from psycopg2.extensions import cursor as TupleCursor
+from psycopg2.extras import execute_values
 from data.db_connection import get_connection
+from data.table_holdings_crud import HOLDING_KEY, holding_deltas, apply_holding_deltas, rebuild_holding
 
 # -----------------------------
 # INSERT FUNCTIONS
@@ -8,12 +18,10 @@ from data.db_connection import get_connection
 
 def insert_transaction(portfolio_seq_no: int, in_out: int, user_seq_no: int, asset_type: str, asset_code: str,
                        quantity: float, price: float, currency: str, user_ins: str):
-    """Insert a single transaction record."""
+    """Insert a single transaction record and update the matching holding."""
     try:
-        conn = get_connection()
-        if not conn:
-            return
-        with conn:
+        now = datetime.now()
+        with get_connection() as conn:
             with conn.cursor() as cur:
                 cur.execute(
                     """
@@ -23,45 +31,110 @@ def insert_transaction(portfolio_seq_no: int, in_out: int, user_seq_no: int, ass
                     VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
                     """,
                     (portfolio_seq_no, in_out, user_seq_no, asset_type, asset_code,
-                     quantity, price, currency, datetime.now(), user_ins, datetime.now())
+                     quantity, price, currency, now, user_ins, now)
                 )
+                apply_holding_deltas(cur, holding_deltas([{
+                    "in_out": in_out, "user_seq_no": user_seq_no, "asset_type": asset_type,
+                    "asset_code": asset_code, "quantity": quantity, "price": price, "currency": currency
+                }], now))
         print("Transaction inserted successfully!")
     except Exception as e:
         print(f"Error inserting transaction: {e}")
 
 
+# Batches at or above this size are streamed with COPY, smaller ones use paged multi-row VALUES.
+COPY_THRESHOLD = int(os.getenv("TXN_COPY_THRESHOLD", 1000))
+VALUES_PAGE_SIZE = 500
+
+BATCH_COLUMNS = ("portfolio_seq_no", "in_out", "user_seq_no", "asset_type", "asset_code",
+                 "quantity", "price", "currency", "timestamp_txn", "user_ins")
+
+
+def _batch_rows(records: list, timestamp_txn: datetime):
+    """Yield one insert tuple per record, in BATCH_COLUMNS order."""
+    for rec in records:
+        yield (
+            rec["portfolio_seq_no"],
+            rec["in_out"],
+            rec["user_seq_no"],
+            rec["asset_type"],
+            rec["asset_code"],
+            rec["quantity"],
+            rec["price"],
+            rec["currency"],
+            timestamp_txn,
+            rec["user_ins"]
+        )
+
+
+class _CsvRowStream:
+    """File-like object that renders rows as CSV on demand for cur.copy_expert()."""
+
+    def __init__(self, rows, rows_per_chunk=1000):
+        self._rows = iter(rows)
+        self._rows_per_chunk = rows_per_chunk
+        self._buf = io.StringIO()
+        self._writer = csv.writer(self._buf, lineterminator="\n")
+        self._pending = ""
+
+    def _fill(self):
+        for _, row in zip(range(self._rows_per_chunk), self._rows):
+            self._writer.writerow(row)
+        chunk = self._buf.getvalue()
+        self._buf.seek(0)
+        self._buf.truncate()
+        return chunk
+
+    def read(self, size=-1):
+        while size < 0 or len(self._pending) < size:
+            chunk = self._fill()
+            if not chunk:
+                break
+            self._pending += chunk
+        if size < 0:
+            size = len(self._pending)
+        out, self._pending = self._pending[:size], self._pending[size:]
+        return out
+
+
 def insert_transactions_batch(records: list):
-    """Insert multiple transaction records at once."""
+    """
+    Insert multiple transaction records at once.
+
+    Uses COPY FROM a streamed CSV buffer for large batches and paged
+    multi-row VALUES otherwise. The affected holdings are updated with one
+    aggregated upsert in the same transaction. Returns a dict with rows,
+    method, seconds and rows_per_sec (or None on error).
+    """
+    if not records:
+        return {"rows": 0, "method": None, "seconds": 0.0, "rows_per_sec": 0.0}
+    method = "copy" if len(records) >= COPY_THRESHOLD else "values"
     try:
-        conn = get_connection()
-        if not conn:
-            return
-        with conn:
+        started = time.perf_counter()
+        now = datetime.now()
+        rows = _batch_rows(records, now)
+        with get_connection() as conn:
             with conn.cursor() as cur:
-                for rec in records:
-                    cur.execute(
-                        """
-                        INSERT INTO transactions
-                        (portfolio_seq_no, in_out, user_seq_no, asset_type, asset_code,
-                         quantity, price, currency, timestamp_txn, user_ins)
-                        VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-                        """,
-                        (
-                            rec["portfolio_seq_no"],
-                            rec["in_out"],
-                            rec["user_seq_no"],
-                            rec["asset_type"],
-                            rec["asset_code"],
-                            rec["quantity"],
-                            rec["price"],
-                            rec["currency"],
-                            datetime.now(),
-                            rec["user_ins"]
-                        )
+                if method == "copy":
+                    cur.copy_expert(
+                        f"COPY transactions ({', '.join(BATCH_COLUMNS)}) FROM STDIN WITH (FORMAT csv)",
+                        _CsvRowStream(rows)
+                    )
+                else:
+                    execute_values(
+                        cur,
+                        f"INSERT INTO transactions ({', '.join(BATCH_COLUMNS)}) VALUES %s",
+                        rows,
+                        page_size=VALUES_PAGE_SIZE
                     )
-        print(f"{len(records)} transactions inserted successfully!")
+                apply_holding_deltas(cur, holding_deltas(records, now))
+        seconds = time.perf_counter() - started
+        rate = len(records) / seconds if seconds > 0 else float("inf")
+        print(f"{len(records)} transactions inserted successfully! ({method}, {rate:,.0f} rows/s)")
+        return {"rows": len(records), "method": method, "seconds": seconds, "rows_per_sec": rate}
     except Exception as e:
         print(f"Error inserting transactions batch: {e}")
+        return None
 
 
 # -----------------------------
@@ -71,10 +144,7 @@ def insert_transactions_batch(records: list):
 def fetch_transactions_by_seq_no(seq_no: int):
     """Fetch a single transaction by seq_no."""
     try:
-        conn = get_connection()
-        if not conn:
-            return None
-        with conn.cursor() as cur:
+        with get_connection() as conn, conn.cursor() as cur:
             cur.execute(
                 """
                 SELECT portfolio_seq_no, in_out, user_seq_no, asset_type, asset_code,
@@ -94,13 +164,7 @@ def fetch_transactions_by_seq_no(seq_no: int):
 def fetch_transactions_by_user_asset(asset_code: str, user_seq_no: int):
     """Fetch all transactions for a user and a specific asset."""
     try:
-        conn = get_connection()
-        print(f"conn={conn}")
-        if not conn:
-            return []
-        with conn.cursor() as cur:
-            print(f"conn={conn}")
-           
+        with get_connection() as conn, conn.cursor() as cur:
             cur.execute(
                 """
                 SELECT portfolio_seq_no, in_out, user_seq_no, asset_type, asset_code,
@@ -123,10 +187,7 @@ def fetch_transactions_by_user_asset(asset_code: str, user_seq_no: int):
 def fetch_all_user_transactions(user_seq_no: int):
     """Fetch all transactions for a specific user."""
     try:
-        conn = get_connection()
-        if not conn:
-            return []
-        with conn.cursor() as cur:
+        with get_connection() as conn, conn.cursor() as cur:
             cur.execute(
                 """
                 SELECT portfolio_seq_no, in_out, user_seq_no, asset_type, asset_code,
@@ -147,10 +208,7 @@ def fetch_all_user_transactions(user_seq_no: int):
 def fetch_all_transactions():
     """Fetch all transactions."""
     try:
-        conn = get_connection()
-        if not conn:
-            return []
-        with conn.cursor() as cur:
+        with get_connection() as conn, conn.cursor() as cur:
             cur.execute(
                 """
                 SELECT portfolio_seq_no, in_out, user_seq_no, asset_type, asset_code,
@@ -166,24 +224,142 @@ def fetch_all_transactions():
         return []
 
 
+# -----------------------------
+# STREAMING SELECT FUNCTIONS
+# -----------------------------
+# Named (server-side) cursors: Postgres keeps the result set and we pull
+# STREAM_CHUNK_SIZE rows per round trip, so only one chunk of rows is ever
+# held in Python at a time. Rows come back as plain tuples (no per-row dict)
+# and quantity / price are cast to float8 in SQL, so no Decimal is created.
+STREAM_CHUNK_SIZE = int(os.getenv("TXN_STREAM_CHUNK_SIZE", 10000))
+
+TRANSACTION_COLUMNS = ("portfolio_seq_no", "in_out", "user_seq_no", "asset_type", "asset_code",
+                       "quantity", "price", "currency", "timestamp_txn", "user_ins", "timestamp_ins",
+                       "user_upd", "timestamp_upd", "seq_no")
+
+# Column dtypes of transaction frames; columns not listed stay object
+TRANSACTION_DTYPES = {
+    "portfolio_seq_no": "int64",
+    "in_out"          : "int8",
+    "user_seq_no"     : "int64",
+    "asset_type"      : "category",
+    "asset_code"      : "category",
+    "quantity"        : "float64",
+    "price"           : "float64",
+    "currency"        : "category",
+    "timestamp_txn"   : "datetime64[ns]",
+    "timestamp_ins"   : "datetime64[ns]",
+    "timestamp_upd"   : "datetime64[ns]",
+    "seq_no"          : "int64",
+}
+
+_STREAM_SELECT = ", ".join(f"{col}::float8" if TRANSACTION_DTYPES.get(col) == "float64" else col
+                           for col in TRANSACTION_COLUMNS)
+
+_cursor_ids = itertools.count()
+
+
+def _stream_rows(query: str, params: tuple, chunk_size: int = None):
+    """Run `query` on a named cursor and yield lists of at most chunk_size row tuples."""
+    chunk_size = chunk_size or STREAM_CHUNK_SIZE
+    with get_connection() as conn:
+        with conn.cursor(name=f"txn_stream_{next(_cursor_ids)}", cursor_factory=TupleCursor) as cur:
+            cur.itersize = chunk_size
+            cur.execute(query, params)
+            while True:
+                rows = cur.fetchmany(chunk_size)
+                if not rows:
+                    break
+                yield rows
+
+
+def stream_all_user_transactions(user_seq_no: int, chunk_size: int = None):
+    """
+    Yield a user's transactions (oldest first) in chunks from a server-side cursor.
+
+    Errors are re-raised after logging: chunks may already have been consumed,
+    and a truncated history must not pass for a complete one.
+    """
+    try:
+        yield from _stream_rows(
+            f"""
+            SELECT {_STREAM_SELECT}
+            FROM transactions
+            WHERE user_seq_no = %s
+            ORDER BY timestamp_txn ASC
+            """,
+            (user_seq_no,),
+            chunk_size
+        )
+    except Exception as e:
+        print(f"Error streaming transactions for user_seq_no={user_seq_no}: {e}")
+        raise
+
+
+def stream_all_transactions(chunk_size: int = None):
+    """Yield every transaction (oldest first) in chunks from a server-side cursor (errors re-raised)."""
+    try:
+        yield from _stream_rows(
+            f"""
+            SELECT {_STREAM_SELECT}
+            FROM transactions
+            ORDER BY timestamp_txn ASC
+            """,
+            (),
+            chunk_size
+        )
+    except Exception as e:
+        print(f"Error streaming all transactions: {e}")
+        raise
+
+
+def typed_frame(rows, columns=TRANSACTION_COLUMNS, dtypes=TRANSACTION_DTYPES):
+    """Build a DataFrame column by column from row tuples, with explicit dtypes."""
+    values = list(zip(*rows)) if rows else [()] * len(columns)
+    return pd.DataFrame({col: pd.Series(vals, dtype=dtypes.get(col, "object"))
+                         for col, vals in zip(columns, values)})
+
+
+def transactions_dataframe(chunks, columns=TRANSACTION_COLUMNS, dtypes=TRANSACTION_DTYPES):
+    """
+    Assemble streamed chunks into one typed DataFrame.
+
+    Each chunk is converted to typed columns as it arrives, so row tuples
+    never outlive their chunk; categorical columns are merged with
+    union_categoricals so they stay categorical across chunks.
+    """
+    frames = [typed_frame(rows, columns, dtypes) for rows in chunks]
+    if not frames:
+        return typed_frame([], columns, dtypes)
+    if len(frames) == 1:
+        return frames[0]
+    return pd.DataFrame({
+        col: (union_categoricals([f[col] for f in frames]) if dtypes.get(col) == "category"
+              else pd.concat([f[col] for f in frames], ignore_index=True))
+        for col in columns
+    })
+
+
 # -----------------------------
 # UPDATE FUNCTION
 # -----------------------------
 
 def update_transaction(seq_no: int, updates: dict):
-    """Update a transaction by seq_no."""
+    """Update a transaction by seq_no and rebuild the holdings it moved between."""
     try:
-        conn = get_connection()
-        if not conn:
-            return
         set_clause = ", ".join([f"{k} = %s" for k in updates.keys()])
         values = list(updates.values())
         values.append(datetime.now())  # timestamp_upd
         values.append(seq_no)          # WHERE seq_no
         query = f"UPDATE transactions SET {set_clause}, timestamp_upd = %s WHERE seq_no = %s"
-        with conn:
+        with get_connection() as conn:
             with conn.cursor() as cur:
-                cur.execute(query, tuple(values))
+                cur.execute(f"SELECT {', '.join(HOLDING_KEY)} FROM transactions WHERE seq_no = %s FOR UPDATE", (seq_no,))
+                old = cur.fetchone()
+                cur.execute(query + f" RETURNING {', '.join(HOLDING_KEY)}", tuple(values))
+                new = cur.fetchone()
+                for key in {tuple(row[col] for col in HOLDING_KEY) for row in (old, new) if row}:
+                    rebuild_holding(cur, key)
         print(f"Transaction seq_no={seq_no} updated successfully!")
     except Exception as e:
         print(f"Error updating transaction seq_no={seq_no}: {e}")
@@ -194,14 +370,14 @@ def update_transaction(seq_no: int, updates: dict):
 # -----------------------------
 
 def delete_transaction(seq_no: int):
-    """Delete a transaction by seq_no."""
+    """Delete a transaction by seq_no and rebuild its holding."""
     try:
-        conn = get_connection()
-        if not conn:
-            return
-        with conn:
+        with get_connection() as conn:
             with conn.cursor() as cur:
-                cur.execute("DELETE FROM transactions WHERE seq_no = %s", (seq_no,))
+                cur.execute(f"DELETE FROM transactions WHERE seq_no = %s RETURNING {', '.join(HOLDING_KEY)}", (seq_no,))
+                row = cur.fetchone()
+                if row:
+                    rebuild_holding(cur, tuple(row[col] for col in HOLDING_KEY))
         print(f"Transaction seq_no={seq_no} deleted successfully!")
     except Exception as e:
         print(f"Error deleting transaction seq_no={seq_no}: {e}")
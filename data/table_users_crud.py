@@ -1,7 +1,45 @@
 # table_users_crud.py
+import os
+import threading
+from collections import OrderedDict
 from datetime import datetime
 from data.db_connection import get_connection
 
+# -----------------------------
+# LOGIN CACHE
+# -----------------------------
+# (username, lower(email)) -> seq_no, bounded LRU so repeat logins skip the DB.
+USER_CACHE_SIZE = int(os.getenv("USER_CACHE_SIZE", 1024))
+
+_user_cache      = OrderedDict()
+_user_cache_lock = threading.Lock()
+
+
+def _user_key(username: str, email: str):
+    return (username.strip(), email.strip().lower())
+
+
+def _cache_get(key):
+    with _user_cache_lock:
+        seq_no = _user_cache.get(key)
+        if seq_no is not None:
+            _user_cache.move_to_end(key)
+        return seq_no
+
+
+def _cache_put(key, seq_no):
+    with _user_cache_lock:
+        _user_cache[key] = seq_no
+        _user_cache.move_to_end(key)
+        while len(_user_cache) > USER_CACHE_SIZE:
+            _user_cache.popitem(last=False)
+
+
+def _cache_forget(seq_no: int):
+    with _user_cache_lock:
+        for key in [k for k, v in _user_cache.items() if v == seq_no]:
+            del _user_cache[key]
+
 # -----------------------------
 # INSERT FUNCTIONS
 # -----------------------------
@@ -9,10 +47,7 @@ from data.db_connection import get_connection
 def insert_users(username: str, email: str, user_ins: str):
     """Insert a single user into the users table."""
     try:
-        conn = get_connection()
-        if not conn:
-            return
-        with conn:
+        with get_connection() as conn:
             with conn.cursor() as cur:
                 cur.execute(
                     """
@@ -29,10 +64,7 @@ def insert_users(username: str, email: str, user_ins: str):
 def insert_users_ft(username: str, email: str):
     """Insert a first-time user into the users table."""
     try:
-        conn = get_connection()
-        if not conn:
-            return
-        with conn:
+        with get_connection() as conn:
             with conn.cursor() as cur:
                 cur.execute(
                     """
@@ -53,10 +85,7 @@ def insert_users_ft(username: str, email: str):
 def fetch_users_by_seq_no(seq_no: int):
     """Fetch a single user by seq_no."""
     try:
-        conn = get_connection()
-        if not conn:
-            return None
-        with conn.cursor() as cur:
+        with get_connection() as conn, conn.cursor() as cur:
             cur.execute(
                 """
                 SELECT username, email, user_ins, timestamp_ins, user_upd, timestamp_upd, seq_no
@@ -74,10 +103,7 @@ def fetch_users_by_seq_no(seq_no: int):
 def fetch_all_users():
     """Fetch all users."""
     try:
-        conn = get_connection()
-        if not conn:
-            return []
-        with conn.cursor() as cur:
+        with get_connection() as conn, conn.cursor() as cur:
             cur.execute(
                 """
                 SELECT username, email, user_ins, timestamp_ins, user_upd, timestamp_upd, seq_no
@@ -93,11 +119,71 @@ def fetch_all_users():
 
 def fetch_user_seq_no(username: str, email: str):
     """Returns the seq_no of a user by username and email."""
-    users = fetch_all_users()
-    for user in users:
-        if user["username"] == username and user["email"] == email:
-            return user["seq_no"]
-    return None
+    key = _user_key(username, email)
+    seq_no = _cache_get(key)
+    if seq_no is not None:
+        return seq_no
+    try:
+        with get_connection() as conn, conn.cursor() as cur:
+            cur.execute(
+                """
+                SELECT seq_no
+                FROM users
+                WHERE username = %s
+                AND lower(email) = %s
+                """,
+                key
+            )
+            row = cur.fetchone()
+    except Exception as e:
+        print(f"Error fetching seq_no for user '{username}': {e}")
+        return None
+    if row is None:
+        return None
+    _cache_put(key, row["seq_no"])
+    return row["seq_no"]
+
+
+# -----------------------------
+# LOGIN (UPSERT OR LOOKUP)
+# -----------------------------
+
+def login_user(username: str, email: str):
+    """
+    Return (seq_no, created) for a user, inserting it on first login.
+
+    One statement against the (username, lower(email)) unique index does
+    both the lookup and the insert; repeat logins are served from the cache.
+    """
+    key = _user_key(username, email)
+    seq_no = _cache_get(key)
+    if seq_no is not None:
+        return seq_no, False
+    with get_connection() as conn, conn.cursor() as cur:
+        cur.execute(
+            """
+            WITH ins AS (
+                INSERT INTO users (username, email, timestamp_ins)
+                VALUES (%s, %s, %s)
+                ON CONFLICT (username, lower(email)) DO NOTHING
+                RETURNING seq_no, TRUE AS created
+            )
+            SELECT seq_no, created FROM ins
+            UNION ALL
+            SELECT seq_no, FALSE AS created
+            FROM users
+            WHERE username = %s
+            AND lower(email) = %s
+            LIMIT 1
+            """,
+            (key[0], email.strip(), datetime.now(), key[0], key[1])
+        )
+        row = cur.fetchone()
+    if row is None:
+        # Lost an insert race: the winner committed after our snapshot was taken.
+        return fetch_user_seq_no(username, email), False
+    _cache_put(key, row["seq_no"])
+    return row["seq_no"], row["created"]
 
 
 # -----------------------------
@@ -110,17 +196,15 @@ def update_users(seq_no: int, updates: dict):
     updates: dict with column names and new values
     """
     try:
-        conn = get_connection()
-        if not conn:
-            return
         set_clause = ", ".join([f"{k} = %s" for k in updates.keys()])
         values = list(updates.values())
         values.append(datetime.now())  # timestamp_upd
         values.append(seq_no)          # WHERE seq_no
         query = f"UPDATE users SET {set_clause}, timestamp_upd = %s WHERE seq_no = %s"
-        with conn:
+        with get_connection() as conn:
             with conn.cursor() as cur:
                 cur.execute(query, tuple(values))
+        _cache_forget(seq_no)
         print(f"User seq_no={seq_no} updated successfully!")
     except Exception as e:
         print(f"Error updating user seq_no={seq_no}: {e}")
@@ -133,12 +217,10 @@ def update_users(seq_no: int, updates: dict):
 def delete_users(seq_no: int):
     """Delete a user by seq_no."""
     try:
-        conn = get_connection()
-        if not conn:
-            return
-        with conn:
+        with get_connection() as conn:
             with conn.cursor() as cur:
                 cur.execute("DELETE FROM users WHERE seq_no = %s", (seq_no,))
+        _cache_forget(seq_no)
         print(f"User seq_no={seq_no} deleted successfully!")
     except Exception as e:
         print(f"Error deleting user seq_no={seq_no}: {e}")
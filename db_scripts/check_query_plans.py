@@ -0,0 +1,161 @@
+import json
+import os
+import sys
+from contextlib import contextmanager
+from psycopg2.extras import RealDictCursor
+from sqlalchemy import create_engine, text
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from db_scripts.migrate import DATABASE_URL, apply_migrations
+from data import table_transactions_crud, table_holdings_crud, table_users_crud
+
+# Runs EXPLAIN on the CRUD queries against a large seeded copy of the schema
+# and exits non-zero if any of them reads users, transactions or holdings with a
+# sequential scan. Everything happens in a scratch schema that is dropped
+# afterwards, so the check is safe to point at a development database.
+#
+#   python db_scripts/check_query_plans.py [rows]
+
+SCHEMA        = "plan_check"
+SEED_ROWS     = int(sys.argv[1]) if len(sys.argv) > 1 else 200_000
+SEED_USERS    = 1_000     # users with transactions
+SEED_ACCOUNTS = 50_000    # rows in users, enough that a lookup should never scan the table
+SEED_ASSETS   = ["BTC", "ETH", "SOL", "ADA", "XRP", "AAPL", "MSFT", "NVDA", "TSLA", "AMZN"]
+WATCHED       = {"users", "transactions", "holdings"}
+
+# (label, call(conn)). fetch_all_transactions and fetch_all_users read the whole table by design and are not checked.
+CHECKS = [
+    ("login_user"                      , lambda conn: table_users_crud.login_user("user42", "User42@example.com")),
+    ("fetch_user_seq_no"               , lambda conn: table_users_crud.fetch_user_seq_no("user42", "user42@example.com")),
+    ("fetch_users_by_seq_no"           , lambda conn: table_users_crud.fetch_users_by_seq_no(42)),
+    ("update_users"                    , lambda conn: table_users_crud.update_users(42, {"email": "new@example.com"})),
+    ("delete_users"                    , lambda conn: table_users_crud.delete_users(42)),
+    ("fetch_transactions_by_seq_no"    , lambda conn: table_transactions_crud.fetch_transactions_by_seq_no(4242)),
+    ("fetch_transactions_by_user_asset", lambda conn: table_transactions_crud.fetch_transactions_by_user_asset("BTC", 42)),
+    ("fetch_all_user_transactions"     , lambda conn: table_transactions_crud.fetch_all_user_transactions(42)),
+    ("update_transaction"              , lambda conn: table_transactions_crud.update_transaction(4242, {"quantity": 1})),
+    ("delete_transaction"              , lambda conn: table_transactions_crud.delete_transaction(4242)),
+    ("rebuild_holding"                 , lambda conn: table_holdings_crud.rebuild_holding(conn.cursor(), (42, "CRYPTO", "BTC", "USD"))),
+    ("fetch_user_holdings"             , lambda conn: table_holdings_crud.fetch_user_holdings(42)),
+    ("fetch_user_holdings (asset)"     , lambda conn: table_holdings_crud.fetch_user_holdings(42, "BTC")),
+]
+
+
+class ExplainCursor:
+    """Cursor stand-in that records EXPLAIN output instead of running statements."""
+
+    def __init__(self, cur, plans):
+        self._cur = cur
+        self._plans = plans
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self._cur.close()
+
+    def execute(self, query, params=None):
+        # Plain EXPLAIN plans the statement without executing it, so writes are safe
+        self._cur.execute("EXPLAIN (FORMAT JSON) " + query, params)
+        plan = self._cur.fetchone()["QUERY PLAN"]
+        self._plans.append((query, plan if isinstance(plan, list) else json.loads(plan)))
+
+    def fetchone(self):
+        return None
+
+    def fetchall(self):
+        return []
+
+
+class ExplainConnection:
+    def __init__(self, conn, plans):
+        self._conn = conn
+        self._plans = plans
+
+    def cursor(self):
+        return ExplainCursor(self._conn.cursor(cursor_factory=RealDictCursor), self._plans)
+
+
+def seq_scans(node):
+    """Yield the watched relations read by a Seq Scan anywhere in a plan tree."""
+    if node.get("Node Type") == "Seq Scan" and node.get("Relation Name") in WATCHED:
+        yield node["Relation Name"]
+    for child in node.get("Plans", []):
+        yield from seq_scans(child)
+
+
+def seed(engine):
+    with engine.begin() as conn:
+        conn.execute(text(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE; CREATE SCHEMA {SCHEMA};"))
+    apply_migrations(engine)
+    with engine.begin() as conn:
+        conn.execute(text("""
+        INSERT INTO users (username, email, timestamp_ins)
+        SELECT 'user' || i, 'user' || i || '@example.com', now()
+        FROM generate_series(1, :accounts) AS i;
+        """), {"accounts": SEED_ACCOUNTS})
+        conn.execute(text("""
+        INSERT INTO transactions
+        (portfolio_seq_no, in_out, user_seq_no, asset_type, asset_code,
+         quantity, price, currency, timestamp_txn, user_ins, timestamp_ins)
+        SELECT 0, (i % 3 > 0)::int, 1 + i % :users,
+               CASE WHEN i % :assets < 5 THEN 'CRYPTO' ELSE 'STOCK' END,
+               (:codes)[1 + i % :assets],
+               1 + random() * 10, 10 + random() * 1000, 'USD',
+               now() - (i || ' minutes')::interval, 'seed', now()
+        FROM generate_series(1, :rows) AS i;
+        """), {"users": SEED_USERS, "assets": len(SEED_ASSETS), "codes": SEED_ASSETS, "rows": SEED_ROWS})
+        conn.execute(text("""
+        INSERT INTO holdings
+        (user_seq_no, asset_type, asset_code, currency, quantity, bought_qty, bought_cost, last_txn)
+        SELECT user_seq_no, asset_type, asset_code, currency,
+               SUM(CASE WHEN in_out = 1 THEN quantity ELSE -quantity END),
+               SUM(CASE WHEN in_out = 1 THEN quantity ELSE 0 END),
+               SUM(CASE WHEN in_out = 1 THEN quantity * price ELSE 0 END),
+               MAX(timestamp_txn)
+        FROM transactions
+        GROUP BY user_seq_no, asset_type, asset_code, currency;
+        """))
+        conn.execute(text("ANALYZE users; ANALYZE transactions; ANALYZE holdings;"))
+    print(f"Seeded {SEED_ACCOUNTS:,} users and {SEED_ROWS:,} transactions for {SEED_USERS:,} of them in schema {SCHEMA}")
+
+
+def main():
+    engine = create_engine(DATABASE_URL, connect_args={"options": f"-c search_path={SCHEMA}"})
+    seed(engine)
+
+    raw = engine.raw_connection()
+    failures = 0
+    try:
+        for label, call in CHECKS:
+            plans = []
+            conn = ExplainConnection(raw.driver_connection, plans)
+
+            @contextmanager
+            def explain_connection():
+                yield conn
+
+            for module in (table_transactions_crud, table_holdings_crud, table_users_crud):
+                module.get_connection = explain_connection
+            call(conn)
+            raw.rollback()   # a failed EXPLAIN must not poison the next check
+
+            scans = sorted({rel for _, plan in plans for rel in seq_scans(plan[0]["Plan"])})
+            status = "OK  " if plans and not scans else "FAIL"
+            failures += status == "FAIL"
+            detail = f"seq scan on {', '.join(scans)}" if scans else f"{len(plans)} statement(s) planned"
+            print(f"{status} {label:<34} {detail}")
+    finally:
+        raw.rollback()
+        raw.close()
+        with engine.begin() as conn:
+            conn.execute(text(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE;"))
+
+    if failures:
+        print(f"{failures} query plan(s) fall back to a sequential scan!")
+        sys.exit(1)
+    print("All checked queries use indexes!")
+
+
+if __name__ == "__main__":
+    main()
@@ -22,6 +22,17 @@ users_table = Table(
 metadata.create_all(engine)
 print("Users table created successfully!")
 
+# --- Unique login index (username + case-insensitive email) ---
+# Backs the single-statement upsert in data/table_users_crud.login_user().
+# Fails if the table already holds duplicate (username, lower(email)) rows.
+with engine.begin() as conn:
+    conn.execute(text("""
+    CREATE UNIQUE INDEX IF NOT EXISTS ux_users_username_email
+    ON users (username, lower(email));
+    """))
+
+print("Login index created successfully!")
+
 # --- Create trigger function in PostgreSQL ---
 with engine.connect() as conn:
     conn.execute(text("""
@@ -0,0 +1,45 @@
+-- Baseline schema, matching db_scripts/create_table_*.py.
+-- Every statement is IF NOT EXISTS, so databases created by those scripts
+-- are simply marked as being at version 0001.
+
+CREATE TABLE IF NOT EXISTS users (
+    username      VARCHAR   NOT NULL,
+    email         VARCHAR   NOT NULL,
+    user_ins      INTEGER,
+    timestamp_ins TIMESTAMP,
+    user_upd      VARCHAR,
+    timestamp_upd TIMESTAMP,
+    seq_no        SERIAL    PRIMARY KEY
+);
+
+CREATE UNIQUE INDEX IF NOT EXISTS ux_users_username_email
+    ON users (username, lower(email));
+
+CREATE TABLE IF NOT EXISTS transactions (
+    portfolio_seq_no INTEGER        NOT NULL,
+    in_out           INTEGER        NOT NULL,
+    user_seq_no      INTEGER        NOT NULL,
+    asset_type       VARCHAR        NOT NULL,
+    asset_code       VARCHAR        NOT NULL,
+    quantity         NUMERIC(12,4)  NOT NULL,
+    price            NUMERIC(12,2)  NOT NULL,
+    currency         VARCHAR        NOT NULL,
+    timestamp_txn    TIMESTAMP      NOT NULL,
+    user_ins         VARCHAR        NOT NULL,
+    timestamp_ins    TIMESTAMP,
+    user_upd         VARCHAR,
+    timestamp_upd    TIMESTAMP,
+    seq_no           SERIAL         PRIMARY KEY
+);
+
+CREATE TABLE IF NOT EXISTS holdings (
+    user_seq_no INTEGER        NOT NULL,
+    asset_type  VARCHAR        NOT NULL,
+    asset_code  VARCHAR        NOT NULL,
+    currency    VARCHAR        NOT NULL,
+    quantity    NUMERIC(18,4)  NOT NULL,
+    bought_qty  NUMERIC(18,4)  NOT NULL,
+    bought_cost NUMERIC(20,2)  NOT NULL,
+    last_txn    TIMESTAMP      NOT NULL,
+    PRIMARY KEY (user_seq_no, asset_type, asset_code, currency)
+);
@@ -0,0 +1,10 @@
+-- Composite indexes for the transaction access paths in data/table_transactions_crud.py:
+--   fetch_transactions_by_user_asset      WHERE asset_code = ? AND user_seq_no = ?
+--   rebuild_holding (table_holdings_crud) WHERE user_seq_no, asset_type, asset_code, currency
+--   fetch_all_user_transactions           WHERE user_seq_no = ? ORDER BY timestamp_txn
+
+CREATE INDEX IF NOT EXISTS ix_transactions_asset_user
+    ON transactions (asset_code, user_seq_no);
+
+CREATE INDEX IF NOT EXISTS ix_transactions_user_time
+    ON transactions (user_seq_no, timestamp_txn);
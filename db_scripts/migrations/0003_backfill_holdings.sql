@@ -0,0 +1,16 @@
+-- Fill holdings from the transaction history.
+-- 0001 creates holdings empty; on a database that already has transactions
+-- every later insert would only add its delta on top of nothing. holdings is
+-- derived data, so it is rebuilt from scratch (a no-op on a new database).
+
+DELETE FROM holdings;
+
+INSERT INTO holdings (user_seq_no, asset_type, asset_code, currency,
+                      quantity, bought_qty, bought_cost, last_txn)
+SELECT user_seq_no, asset_type, asset_code, currency,
+       SUM(CASE WHEN in_out = 1 THEN quantity ELSE -quantity END),
+       SUM(CASE WHEN in_out = 1 THEN quantity ELSE 0 END),
+       SUM(CASE WHEN in_out = 1 THEN quantity * price ELSE 0 END),
+       MAX(timestamp_txn)
+FROM transactions
+GROUP BY user_seq_no, asset_type, asset_code, currency;
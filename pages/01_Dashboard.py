@@ -1,19 +1,18 @@
 import streamlit      as st
-import plotly.express as px
-import numpy          as np
-from sklearn.linear_model import LinearRegression
-import pandas as pd
-import logging, os, sys, json, warnings
-from datetime import datetime, timedelta
-import requests
+import os, sys, warnings
+from datetime import datetime
 
 # -------------------------------
 # Add project root to path
 # -------------------------------
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-from data.fetch_api_stock import fetch_stock_data
+from data.fetch_api_stock import fetch_stocks_batch
 from data.fetch_api_crypto import fetch_crypto_data
 from data.table_transactions_crud import insert_transaction, fetch_transactions_by_user_asset
+from data.table_holdings_crud import fetch_user_holdings
+from analysis.indicators import linear_trend
+from data import refresher, fetch_engine
+from config_loader import load_config
 
 warnings.simplefilter("ignore", FutureWarning)
 
@@ -65,8 +64,10 @@ st.markdown(f"""
 # -------------------------------
 # CONFIGURATION
 # -------------------------------
-with open("config/config.json") as f:
-    local_config = json.load(f)
+local_config = load_config()
+
+# Keeps prices and quotes warm in the background (one thread per server process)
+refresher.start()
 
 # Coins and stocks only come from JSON now
 config_coins      = local_config.get("coins", [])
@@ -75,7 +76,6 @@ config_currencies = local_config.get("currencies", [])
 
 selected_currency = st.session_state.get("default_currency", local_config.get("defaults", {}).get("default_currency","USD")).lower()
 days = int(os.getenv("DAYS", local_config.get("days", 30)))
-data_refresh_rate = int(os.getenv("DATA_REFRESH_RATE", local_config.get("defaults", {}).get("data_refresh_rate", 15)))
 
 # -------------------------------
 # PAGE HEADER
@@ -85,33 +85,46 @@ col_title.title("AssetPulse – Crypto & Stock Dashboard")
 
 if current_user and user_email:
     col_user.markdown(f"**Logged in as:** {current_user} ({user_email})", unsafe_allow_html=True)
+refresh_status = refresher.status()
+if refresh_status["last_run"]:
+    col_user.caption(f"Prices refreshed in the background every {refresher.refresh_interval() / 60:.0f} min "
+                     f"(last: {datetime.fromtimestamp(refresh_status['last_run']).strftime('%H:%M')})")
 
 asset_type = st.radio("Asset type", ["STOCK","CRYPTO"], key="asset_type_select", horizontal=True)
-title, asset_code, df = "", "", pd.DataFrame()
+title, asset_code = "", ""
+
+# -------------------------------
+# PRICE / INDICATOR PIPELINE
+# -------------------------------
+def load_prices(asset_type, asset_code, days, currency):
+    """
+    Prices with MA7 / MA30 / daily_change / volatility for one asset / currency / range.
+
+    The fetchers are already st.cache_data-cached, so this adds no cache of its
+    own. Their indicator columns come from the incremental engine
+    (analysis.indicators.indicators_for), which keeps rolling state per series
+    and only processes new ticks, so all four columns together cost a few
+    rows per refresh; the checkboxes only choose which of them are shown.
+    """
+    if asset_type == "CRYPTO":
+        return fetch_crypto_data(asset_code, days, currency)
+    # One request warms every configured stock; switching tickers then hits the cache
+    return fetch_stocks_batch(config_stocks, days, currency)[asset_code]
 
 # -------------------------------
 # FETCH DATA
 # -------------------------------
 if asset_type=="CRYPTO":
     asset_code = st.selectbox("Select cryptocurrency", config_coins, key="crypto_select")
-
-    df = fetch_crypto_data(asset_code, days, selected_currency)
-    
-    if df.empty and selected_currency!="usd":
-        df_usd = fetch_crypto_data(asset_code, days, "usd")
-        df = df_usd.copy()
-        df["price"] *= 1.0  # TODO: apply FX conversion
-    
-    df["MA7"], df["MA30"] = df["price"].rolling(7).mean(), df["price"].rolling(30).mean()
-    df["daily_change"], df["volatility"] = df["price"].pct_change()*100, df["price"].rolling(7).std()
-    df.dropna(subset=["MA7"], inplace=True)
     title = f"{asset_code.capitalize()} Price & Indicators ({selected_currency.upper()})"
 
 elif asset_type=="STOCK":
     asset_code = st.selectbox("Select stock", config_stocks, key="stock_select")
-    df = fetch_stock_data(asset_code, days, selected_currency)
     title = f"{asset_code} Stock Price & Indicators ({selected_currency.upper()})"
 
+# Prices are stored in USD and converted through data.fx, so switching currency never refetches
+df = load_prices(asset_type, asset_code, days, selected_currency)
+
 # -------------------------------
 # DISPLAY DATA
 # -------------------------------
@@ -120,6 +133,18 @@ if df.empty or asset_code=="":
 else:
     latest_price = float(df["price"].iloc[-1])
 
+    # Stale-while-revalidate: the last good series is shown at once while it is refreshed in the background
+    age_seconds = df.attrs.get("age_seconds")
+    if df.attrs.get("stale") and age_seconds is not None:
+        provider, refresh_key = df.attrs.get("provider"), df.attrs.get("refresh_key")
+        if provider and not fetch_engine.available(provider):
+            status = "the provider is unavailable, retrying after a cooldown"
+        elif refresh_key and fetch_engine.refreshing(refresh_key):
+            status = "an update is running in the background"
+        else:
+            status = "reload to pick up newer prices"
+        st.caption(f"⏳ Showing prices last refreshed {age_seconds / 60:,.0f} min ago; {status}.")
+
 
     # Indicators
     col1,col2  = st.columns(2)
@@ -129,21 +154,21 @@ else:
     show_trend      = col3.checkbox("Trend (Linear Fit)")
     show_volatility = col4.checkbox("Volatility")
 
-    y_cols = ["price"]
-    if show_ma_07 and "MA7"  in df: y_cols.append("MA7")
-    if show_ma_30 and "MA30" in df: y_cols.append("MA30")
-    if show_volatility and "volatility" in df: y_cols.append("volatility")
+    # Indicator columns are already maintained incrementally; only the ticked ones are shown
+    indicator_toggles = {"MA7": show_ma_07, "MA30": show_ma_30, "volatility": show_volatility}
+    y_cols = ["price"] + [col for col, enabled in indicator_toggles.items() if enabled]
 
+    import plotly.express as px  # deferred: plotly is only needed once there is data to chart
     fig = px.line(df, x="timestamp", y=y_cols, title=title)
     if show_trend:
-        x_num = np.arange(len(df)).reshape(-1,1)
-        df["trend"] = LinearRegression().fit(x_num, df["price"]).predict(x_num)
+        df["trend"] = linear_trend(df["price"].to_numpy())
         fig.add_scatter(x=df["timestamp"], y=df["trend"], mode="lines", name="Trend")
     st.plotly_chart(fig, use_container_width=True)
 
     # Recent data table
     st.subheader("Recent data")
-    recent_df = df.tail(10).copy()
+    shown = ["timestamp"] + y_cols + ["daily_change"] + (["trend"] if show_trend else [])
+    recent_df = df[shown].tail(10).copy()
     recent_df["timestamp"] = recent_df["timestamp"].dt.strftime("%Y-%m-%d %H:%M")
     st.dataframe(recent_df.style.format({c:"{:,.2f}" for c in recent_df.columns if c!="timestamp"}))
 
@@ -181,6 +206,16 @@ with col_sell:
 if user_seq_no is None:
     st.warning("User not logged in. Cannot fetch transactions.")
 else:
+    # Current position, read from the maintained holdings table
+    holdings = fetch_user_holdings(user_seq_no, asset_code.upper())
+    if holdings:
+        st.subheader(f"Position in {asset_code.upper()}")
+        for h in holdings:
+            col_qty, col_avg, col_last = st.columns(3)
+            col_qty.metric(f"Quantity ({h['currency']})", f"{float(h['quantity']):,.4f}")
+            col_avg.metric("Average cost", f"{float(h['avg_cost'] or 0):,.2f} {h['currency']}")
+            col_last.metric("Last transaction", h["last_txn"].strftime("%Y-%m-%d %H:%M"))
+
     try:
         st.subheader(f"Transactions for user '{user_seq_no}' ({asset_code.upper()})")
         transactions = fetch_transactions_by_user_asset(asset_code.upper(), user_seq_no)
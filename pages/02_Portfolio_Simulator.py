@@ -1,27 +1,28 @@
 import streamlit as st
 from datetime import datetime, timedelta
-import plotly.express as px
-import pandas as pd
-import json, os
+import os
 
 # -------------------------------
 # Project imports
 # -------------------------------
-from data.fetch_api_crypto import simulate_crypto_investment_curve
-from data.fetch_api_stock  import simulate_stock_investment_curve
+from data import refresher
+from config_loader import load_config, CONFIG_PATH
+from data.fetch_api_crypto import crypto_price_series
+from data.fetch_api_stock  import stock_price_series
+from analysis.simulation   import dca_schedule, simulate_schedule
+from analysis.projection   import METHODS, PERCENTILES, project
 
 # -------------------------------
 # Load config.json
 # -------------------------------
-BASE_DIR    = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
-CONFIG_PATH = os.path.join(BASE_DIR, "config", "config.json")
-
 if not os.path.exists(CONFIG_PATH):
     st.error(f"Config file not found at {CONFIG_PATH}.")
     st.stop()
 
-with open(CONFIG_PATH, "r") as f:
-    CONFIG = json.load(f)
+CONFIG = load_config()
+
+# Keeps prices and quotes warm in the background (one thread per server process)
+refresher.start()
 
 COIN_MAP = CONFIG.get("coin_map", {})
 if not COIN_MAP:
@@ -85,41 +86,94 @@ currency   = st.session_state.get("default_currency", CONFIG.get("defaults", {})
 asset_type = st.radio("Asset type", ["CRYPTO", "STOCK"], horizontal=True)
 
 symbol   = st.text_input(f"Enter asset symbol (e.g., BTC) [{currency}]:", "BTC").upper()
-max_date = datetime.today().date() - timedelta(days=365)
-invest_date     = st.date_input("Select investment date", value=max_date, max_value=datetime.today().date(), min_value=max_date)
-amount_invested = st.number_input(f"Amount invested on {invest_date} ({currency}):", min_value=1.0, value=1000.0, step=100.0)
+mode     = st.radio("Mode", ["Backtest", "Projection"], horizontal=True)
+
+if mode == "Backtest":
+    max_date = datetime.today().date() - timedelta(days=365)
+    invest_date     = st.date_input("Select investment date", value=max_date, max_value=datetime.today().date(), min_value=max_date)
+    strategy        = st.radio("Strategy", ["Lump sum", "Dollar-cost averaging"], horizontal=True)
+    if strategy == "Lump sum":
+        amount_invested = st.number_input(f"Amount invested on {invest_date} ({currency}):", min_value=1.0, value=1000.0, step=100.0)
+    else:
+        DCA_FREQUENCIES = {"Weekly": "W", "Monthly": "M"}
+        frequency       = st.selectbox("Buy every", list(DCA_FREQUENCIES))
+        amount_invested = st.number_input(f"Amount per purchase ({currency}):", min_value=1.0, value=100.0, step=10.0)
 
 # -------------------------------
 # Simulation
 # -------------------------------
-if st.button("Simulate Investment"):
+if mode == "Backtest" and st.button("Simulate Investment"):
     if invest_date > datetime.today().date():
         st.warning("Investment date cannot be in the future.")
     else:
-        # Fetch historical portfolio data
+        # One cached series per (symbol, currency); date, amount and strategy only change the broadcast
         if asset_type == "CRYPTO":
-            df_prices = simulate_crypto_investment_curve(symbol, invest_date, amount_invested, currency.lower())
+            history = crypto_price_series(symbol, currency.lower())
+        else:
+            history = stock_price_series(symbol, currency.upper())
+
+        if strategy == "Lump sum":
+            invest_dates, amounts = [invest_date], [amount_invested]
         else:
-            df_prices = simulate_stock_investment_curve(symbol, invest_date, amount_invested, currency.upper())
+            invest_dates, amounts = dca_schedule(invest_date, datetime.today().date(), amount_invested,
+                                                 DCA_FREQUENCIES[frequency])
 
-        if df_prices.empty:
+        if history.empty:
             st.warning("Could not fetch historical data for the selected asset.")
         else:
-            df_prices = df_prices[df_prices["timestamp"].dt.date >= invest_date]
+            df_prices = simulate_schedule(history["timestamp"], history["price"], invest_dates, amounts)
             if df_prices.empty:
                 st.warning("No price data available after the selected investment date.")
             else:
-                start_price = df_prices["price"].iloc[0]
-                df_prices["portfolio_value"] = amount_invested * (df_prices["price"] / start_price)
-                final_value = df_prices["portfolio_value"].iloc[-1]
+                total_invested = df_prices["invested"].iloc[-1]
+                final_value    = df_prices["portfolio_value"].iloc[-1]
 
-                st.markdown(f"💰 Your investment of {amount_invested:.2f} {currency} on {invest_date} "
-                            f"would be worth {final_value:.2f} {currency} today")
+                st.markdown(f"💰 Investing {total_invested:.2f} {currency} in {symbol} from {invest_date} "
+                            f"({strategy.lower()}) would be worth {final_value:.2f} {currency} today")
 
+                import plotly.express as px  # deferred: only needed once a simulation is plotted
                 fig = px.line(
-                    df_prices, x="timestamp", y="portfolio_value",
-                    title=f"Portfolio Simulation: {amount_invested} {currency} in {symbol}",
-                    labels={"portfolio_value": f"Portfolio Value ({currency})", "timestamp": "Date"},
+                    df_prices, x="timestamp", y=["portfolio_value", "invested"],
+                    title=f"Portfolio Simulation: {total_invested:.2f} {currency} in {symbol}",
+                    labels={"value": f"Value ({currency})", "timestamp": "Date"},
                     template="plotly_white"
                 )
                 st.plotly_chart(fig, use_container_width=True)
+
+# -------------------------------
+# Forward projection (Monte Carlo)
+# -------------------------------
+if mode == "Projection":
+    # Crypto trades every day; stock steps are trading days (freq="B")
+    step_unit       = "days" if asset_type == "CRYPTO" else "trading days"
+    horizon         = st.slider(f"Horizon ({step_unit})", min_value=30, max_value=730,
+                                value=365 if asset_type == "CRYPTO" else 252, step=5)
+    n_paths         = st.select_slider("Simulated paths", options=[1_000, 5_000, 10_000, 50_000, 100_000], value=10_000)
+    method          = st.radio("Method", METHODS, horizontal=True,
+                               format_func=lambda m: {"bootstrap": "Bootstrap returns", "gbm": "GBM"}[m])
+    amount_invested = st.number_input(f"Amount invested today ({currency}):", min_value=1.0, value=1000.0, step=100.0)
+
+    if st.button("Run Projection"):
+        history = crypto_price_series(symbol, currency.lower()) if asset_type == "CRYPTO" \
+            else stock_price_series(symbol, currency.upper())
+        if len(history) < 30:
+            st.warning("Not enough price history to project from.")
+        else:
+            with st.spinner(f"Simulating {n_paths:,} paths..."):
+                bands = project(history, amount_invested, horizon, n_paths, method,
+                                freq="D" if asset_type == "CRYPTO" else "B")
+            low, mid, high = f"p{PERCENTILES[0]}", "p50", f"p{PERCENTILES[-1]}"
+            st.markdown(f"🔮 After {horizon} {step_unit}, {amount_invested:.2f} {currency} in {symbol} ends between "
+                        f"{bands[low].iloc[-1]:.2f} and {bands[high].iloc[-1]:.2f} {currency} "
+                        f"({PERCENTILES[0]}th-{PERCENTILES[-1]}th percentile), median {bands[mid].iloc[-1]:.2f}")
+
+            import plotly.graph_objects as go  # deferred: only needed once a projection is plotted
+            fig = go.Figure()
+            for lo, hi in zip(PERCENTILES[:2], PERCENTILES[::-1][:2]):
+                fig.add_scatter(x=bands["timestamp"], y=bands[f"p{hi}"], mode="lines", line_width=0, showlegend=False)
+                fig.add_scatter(x=bands["timestamp"], y=bands[f"p{lo}"], mode="lines", line_width=0,
+                                fill="tonexty", fillcolor="rgba(31,119,180,0.2)", name=f"p{lo}-p{hi}")
+            fig.add_scatter(x=bands["timestamp"], y=bands[mid], mode="lines", name="Median")
+            fig.update_layout(title=f"Projection: {amount_invested} {currency} in {symbol} ({n_paths:,} paths)",
+                              xaxis_title="Date", yaxis_title=f"Value ({currency})", template="plotly_white")
+            st.plotly_chart(fig, use_container_width=True)
@@ -1,23 +1,29 @@
 import streamlit as st
 import pandas as pd
-import requests
-import yfinance as yf
-import json, os
-from data.table_transactions_crud import fetch_all_user_transactions
+import os
+from data import refresher
+from config_loader import load_config, cache_ttl, CONFIG_PATH
+from data.table_transactions_crud import stream_all_user_transactions, transactions_dataframe
+from data.table_holdings_crud import fetch_user_holdings
+from data.fetch_api_quotes import get_current_prices
+from analysis.valuation import add_valuation, add_current_value
+from analysis.replay import replay_portfolio
+from data.fetch_api_crypto import fetch_crypto_batch
+from data.fetch_api_stock import fetch_stocks_batch
+from data import fx
 from dotenv import load_dotenv
 
 # -------------------------------
 # Load config.json
 # -------------------------------
-BASE_DIR    = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
-CONFIG_PATH = os.path.join(BASE_DIR, "config", "config.json")
-
 if not os.path.exists(CONFIG_PATH):
     st.error(f"Config file not found at {CONFIG_PATH}.")
     st.stop()
 
-with open(CONFIG_PATH, "r") as f:
-    CONFIG = json.load(f)
+CONFIG = load_config()
+
+# Keeps prices and quotes warm in the background (one thread per server process)
+refresher.start()
 
 COIN_MAP = CONFIG.get("coin_map", {})
 if not COIN_MAP:
@@ -77,20 +83,39 @@ if current_user and user_email:
 
 st.markdown("View all your transactions grouped by asset type with current value.")
 
+# -------------------------------
+# Current positions (holdings table, no transaction scan)
+# -------------------------------
+try:
+    holdings = fetch_user_holdings(user_seq_no)
+    if holdings:
+        df_pos = pd.DataFrame(holdings, columns=[
+            "user_seq_no","asset_type","asset_code","currency","quantity","avg_cost","last_txn"
+        ]).rename(columns={"avg_cost": "price"})
+        keys = set(zip(df_pos["asset_type"].str.upper(), df_pos["asset_code"]))
+        df_pos = add_valuation(df_pos, get_current_prices(tuple(sorted(keys))),
+                               fx_rates=fx.rates_for(df_pos["currency"]))
+        df_pos["last_txn"] = df_pos["last_txn"].dt.strftime("%Y-%m-%d %H:%M")
+        st.subheader("📦 Current Positions")
+        display_pos = df_pos[[
+            "asset_type","asset_code","quantity","price","currency","last_txn",
+            "current_price","variation_%","current_value"
+        ]].rename(columns={"price": "avg_cost"})
+        fmt_cols = {col:"{:,.2f}" for col in ["quantity","avg_cost","current_price","variation_%","current_value"]}
+        st.dataframe(display_pos.style.format(fmt_cols, na_rep="-"))
+except Exception as e:
+    st.error(f"Error loading positions: {e}")
+
 # -------------------------------
 # Fetch transactions
 # -------------------------------
 try:
-    all_tx = fetch_all_user_transactions(user_seq_no)
-    if not all_tx:
+    # Streamed from a server-side cursor as typed columns (float64 / category / datetime64)
+    df_tx = transactions_dataframe(stream_all_user_transactions(user_seq_no))
+    if df_tx.empty:
         st.info("No transactions available.")
         st.stop()
 
-    df_tx = pd.DataFrame(all_tx, columns=[
-        "portfolio_seq_no","in_out","user_seq_no","asset_type","asset_code",
-        "quantity","price","currency","timestamp_txn","user_ins",
-        "timestamp_ins","user_upd","timestamp_upd","seq_no"
-    ])
     df_tx = df_tx[df_tx["user_seq_no"]==user_seq_no]
     if df_tx.empty:
         st.info("No transactions for your account.")
@@ -100,50 +125,37 @@ except Exception as e:
     st.stop()
 
 # -------------------------------
-# Price fetching with caching
-# -------------------------------
-@st.cache_data(ttl=600)
-def get_current_price_crypto(symbol: str, currency="USD"):
-    coin_id = COIN_MAP.get(symbol.upper(), symbol.lower())
-    try:
-        resp = requests.get("https://api.coingecko.com/api/v3/simple/price",
-                            params={"ids": coin_id,"vs_currencies": currency.lower()},
-                            timeout=10).json()
-        price = resp.get(coin_id, {}).get(currency.lower())
-        return float(price) if price else None
-    except Exception as e:
-        st.warning(f"Failed to fetch {symbol}: {e}")
-        return None
-
-@st.cache_data(ttl=600)
-def get_current_price_stock(symbol: str):
-    try:
-        data = yf.Ticker(symbol).history(period="1d")
-        return float(data["Close"].iloc[-1]) if not data.empty else None
-    except:
-        return None
-
-# -------------------------------
-# Add current value, price & variation
-# -------------------------------
-def add_current_value(df):
-    df_display = df.copy()
-    df_display["current_price"] = df_display.apply(
-        lambda r: get_current_price_crypto(r["asset_code"]) if r["asset_type"].upper()=="CRYPTO"
-        else get_current_price_stock(r["asset_code"]), axis=1
-    )
-    df_display["variation_%"] = df_display.apply(
-        lambda r: ((float(r["current_price"])-float(r["price"]))/float(r["price"])*100) 
-        if r["current_price"] is not None else None, axis=1
-    )
-    df_display["current_value"] = df_display.apply(
-        lambda r: float(r["current_price"])*float(r["quantity"]) if r["current_price"] else None, axis=1
-    )
-    df_display["timestamp_txn"] = df_display["timestamp_txn"].dt.strftime("%Y-%m-%d %H:%M")
-    return df_display
-
-# -------------------------------
-# Process transactions
+# Portfolio value history (transaction replay)
+# -------------------------------
+@st.cache_data(ttl=cache_ttl(600), show_spinner=False)
+def load_histories(assets, days, currency):
+    """{(asset_type, asset_code): [timestamp, price]} for every traded asset, from the price store."""
+    coins  = [code for asset_type, code in assets if asset_type == "CRYPTO"]
+    stocks = [code for asset_type, code in assets if asset_type == "STOCK"]
+    histories = {}
+    if coins:
+        histories.update({("CRYPTO", c): f for c, f in fetch_crypto_batch(coins, days, currency).items()})
+    if stocks:
+        histories.update({("STOCK", s): f for s, f in fetch_stocks_batch(stocks, days, currency, with_indicators=False).items()})
+    return histories
+
+try:
+    display_currency = st.session_state.get("default_currency", CONFIG.get("defaults", {}).get("default_currency", "USD")).upper()
+    traded  = tuple(sorted(set(zip(df_tx["asset_type"].astype(str).str.upper(), df_tx["asset_code"].astype(str)))))
+    history_days = max((pd.Timestamp.today() - df_tx["timestamp_txn"].min()).days + 1, 2)
+    df_value = replay_portfolio(df_tx, load_histories(traded, history_days, display_currency.lower()))
+    if not df_value.empty:
+        import plotly.express as px  # deferred: only needed once there is a history to chart
+        st.subheader(f"📈 Portfolio Value History ({display_currency})")
+        value_cols = [c for c in df_value.columns if c != "timestamp"]
+        fig = px.line(df_value, x="timestamp", y=value_cols,
+                      labels={"value": f"Value ({display_currency})", "timestamp": "Date", "variable": ""})
+        st.plotly_chart(fig, use_container_width=True)
+except Exception as e:
+    st.error(f"Error building portfolio history: {e}")
+
+# -------------------------------
+# Process transactions (current value, price & variation)
 # -------------------------------
 try:
     df_all = add_current_value(df_tx)
@@ -166,4 +178,4 @@ for asset_type in df_all["asset_type"].str.upper().unique():
         "current_price","variation_%","current_value"
     ]].sort_values("timestamp_txn").reset_index(drop=True)
     fmt_cols = {col:"{:,.2f}" for col in ["quantity","price","current_price","variation_%","current_value"]}
-    st.dataframe(display_df.style.format(fmt_cols))
+    st.dataframe(display_df.style.format(fmt_cols, na_rep="-"))
@@ -1,6 +1,7 @@
 import streamlit as st
 import json
 import os
+from config_loader import USER_SETTINGS_PATH
 
 # ==========================================================
 # 🌐 PAGE CONFIG
@@ -114,10 +115,9 @@ def save_settings():
     st.session_state["data_refresh_rate"]= data_refresh_rate
     st.session_state["enable_logging"]   = enable_logging
 
-    # Optionally save to JSON for persistence
-    config_dir = os.path.join(os.getcwd(), "config")
-    os.makedirs(config_dir, exist_ok=True)
-    config_path = os.path.join(config_dir, "user_settings.json")
+    # Persist to JSON; the background refresher and fetch caches read data_refresh_rate from it
+    config_path = USER_SETTINGS_PATH
+    os.makedirs(os.path.dirname(config_path), exist_ok=True)
 
     settings = {
         "app_theme"        : app_theme,